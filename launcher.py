@@ -2,13 +2,36 @@ import os
 import sys
 import json
 import base64
+import hashlib
+import struct
+import io
+import queue
+import tarfile
+import gzip
+import zipfile
+import itertools
+import heapq
+import bisect
+import math
+import collections
+import argparse
+import time
 import threading
 import sqlite3
 import bcrypt
 import requests
 import socket
+import platform
+import http.server
+import shutil
+import mmap
 import subprocess
+import ctypes
+import re
 from pathlib import Path
+from urllib.parse import quote, urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 import tkinter as tk
 import customtkinter as ctk
 from PIL import Image
@@ -17,6 +40,1257 @@ from tkinter import messagebox
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+class DownloadJournal:
+    """Remembers partially written files so interrupted downloads can resume"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, part_path):
+        with self.lock:
+            return dict(self.entries.get(str(Path(part_path).resolve()), {}))
+
+    def record(self, part_path, entry):
+        with self.lock:
+            self.entries[str(Path(part_path).resolve())] = entry
+            self.save()
+
+    def remove(self, part_path):
+        with self.lock:
+            if self.entries.pop(str(Path(part_path).resolve()), None) is not None:
+                self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
+
+class HttpCache:
+    """Persistent cache of small JSON responses, revalidated with conditional requests"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def lookup(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            return entry["body"] if entry else None
+
+    def get_json(self, session, url, headers=None):
+        """Returns (data, from_cache); a 304 answer is served from the cache"""
+        with self.lock:
+            entry = self.entries.get(url)
+        request_headers = dict(headers or {})
+        if entry and entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(url, headers=request_headers, timeout=30)
+        if response.status_code == 304 and entry:
+            return entry["body"], True
+        response.raise_for_status()
+        data = response.json()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self.lock:
+                self.entries[url] = {"etag": etag, "last_modified": last_modified, "body": data}
+                self.save()
+        return data, False
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
+
+class RateLimited(requests.RequestException):
+    """GitHub has refused, or would refuse, API requests until reset_at (epoch seconds)"""
+
+    def __init__(self, reset_at):
+        super().__init__(f"GitHub API rate limit reached until {time.strftime('%H:%M', time.localtime(reset_at))}")
+        self.reset_at = reset_at
+
+class RateLimitGovernor:
+    """Follows GitHub's X-RateLimit headers and holds API requests back before the limit is hit.
+
+    observe is installed as a requests response hook, so every API response updates the
+    budget and a rate-limited answer surfaces as RateLimited wherever the request was made.
+    """
+
+    def __init__(self, host="api.github.com", reserve=5):
+        self.host = host
+        self.reserve = reserve
+        self.lock = threading.Lock()
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+
+    def observe(self, response, *args, **kwargs):
+        if urlsplit(response.url).netloc != self.host:
+            return
+        headers = response.headers
+        with self.lock:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+                self.limit = int(headers.get("X-RateLimit-Limit", 0)) or None
+                self.reset_at = float(headers.get("X-RateLimit-Reset", 0))
+            if response.status_code not in (403, 429):
+                return
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                self.blocked_until = time.time() + float(retry_after)
+            elif self.remaining == 0:
+                self.blocked_until = self.reset_at
+            else:
+                return
+            blocked_until = self.blocked_until
+        raise RateLimited(blocked_until)
+
+    def acquire(self, essential=True):
+        """Raises RateLimited instead of spending the request; routine checks leave a reserve for updates"""
+        with self.lock:
+            now = time.time()
+            if now < self.blocked_until:
+                raise RateLimited(self.blocked_until)
+            if self.remaining is not None and now < self.reset_at:
+                if self.remaining <= (0 if essential else self.reserve):
+                    raise RateLimited(self.reset_at)
+                # Corrected by the next response; a 304 does not count against the limit at all
+                self.remaining -= 1
+
+    def seconds_blocked(self, essential=False):
+        with self.lock:
+            now = time.time()
+            until = self.blocked_until
+            if self.remaining is not None and self.remaining <= (0 if essential else self.reserve):
+                until = max(until, self.reset_at)
+            return max(until - now, 0.0)
+
+    def describe(self):
+        """Explains a deferred check for the UI, or returns an empty string"""
+        seconds = self.seconds_blocked()
+        if not seconds:
+            return ""
+        resume = time.strftime("%H:%M", time.localtime(time.time() + seconds))
+        reason = "reached" if time.time() < self.blocked_until or self.remaining == 0 else "nearly used up"
+        return f"GitHub rate limit {reason}; using cached update info until {resume}"
+
+class UpdateProgress:
+    """Byte and file counters for the updater, published to subscribers as throttled snapshots.
+
+    Each subscriber gets its own queue of event dicts, so the Tk dialog and a headless
+    logger can follow the same update without touching each other's threads.
+    """
+
+    def __init__(self, interval=0.25, window=5.0):
+        self.interval = interval
+        self.window = window
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.reset("Idle")
+
+    def reset(self, phase):
+        with self.lock:
+            self.phase = phase
+            self.files_done = self.files_total = 0
+            self.bytes_total = 0
+            self.completed_bytes = 0
+            self.in_flight = {}
+            self.samples = collections.deque([(time.monotonic(), 0)])
+            self.last_publish = 0.0
+        self.publish(force=True)
+
+    def subscribe(self):
+        events = queue.Queue()
+        with self.lock:
+            self.subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def add_work(self, files=0, nbytes=0):
+        with self.lock:
+            self.files_total += files
+            self.bytes_total += nbytes or 0
+        self.publish()
+
+    def update_file(self, key, nbytes):
+        """Records how many bytes of an in-flight transfer are on disk"""
+        with self.lock:
+            self.in_flight[key] = nbytes
+        self.publish()
+
+    def file_done(self, key):
+        with self.lock:
+            self.completed_bytes += self.in_flight.pop(key, 0)
+            self.files_done += 1
+        self.publish()
+
+    def finish(self, phase="Done"):
+        with self.lock:
+            self.phase = phase
+        self.publish(force=True)
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            done = self.completed_bytes + sum(self.in_flight.values())
+            self.samples.append((now, done))
+            while len(self.samples) > 2 and now - self.samples[0][0] > self.window:
+                self.samples.popleft()
+            start_time, start_bytes = self.samples[0]
+            rate = (done - start_bytes) / (now - start_time) if now > start_time else 0.0
+            remaining = max(self.bytes_total - done, 0)
+            return {
+                "phase": self.phase,
+                "bytes_done": done,
+                "bytes_total": self.bytes_total,
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "rate": rate,
+                "eta": remaining / rate if rate > 0 else None
+            }
+
+    def publish(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.last_publish < self.interval:
+                return
+            self.last_publish = now
+            subscribers = list(self.subscribers)
+        event = self.snapshot()
+        for events in subscribers:
+            events.put(event)
+
+    @staticmethod
+    def describe(event):
+        mb = 1024 * 1024
+        text = f"{event['phase']}: {event['bytes_done'] / mb:.1f} / {event['bytes_total'] / mb:.1f} MB"
+        text += f" · {event['files_done']}/{event['files_total']} files · {event['rate'] / mb:.1f} MB/s"
+        if event["eta"] is not None:
+            minutes, seconds = divmod(int(event["eta"]), 60)
+            text += f" · ETA {minutes}:{seconds:02d}"
+        return text
+
+    @staticmethod
+    def latest(events):
+        """Drains a subscriber queue and returns the newest event, or None"""
+        event = None
+        try:
+            while True:
+                event = events.get_nowait()
+        except queue.Empty:
+            return event
+
+class BandwidthLimiter:
+    """Token bucket shared by all transfers; lower priority numbers are served first"""
+
+    def __init__(self, rate=None, levels=3):
+        self.rate = rate
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.waiting = [0] * levels
+        self.cond = threading.Condition()
+
+    def set_rate(self, rate):
+        """Sets the cap in bytes per second; None or 0 removes it"""
+        with self.cond:
+            self.rate = rate or None
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+            self.cond.notify_all()
+
+    def refill(self):
+        now = time.monotonic()
+        if self.rate:
+            # Allow half a second of burst at most
+            self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.rate / 2)
+        self.updated = now
+
+    def consume(self, amount, priority):
+        with self.cond:
+            if not self.rate:
+                return
+            self.waiting[priority] += 1
+            try:
+                while self.rate:
+                    self.refill()
+                    if self.tokens > 0 and not any(self.waiting[:priority]):
+                        # Large chunks may overdraw the bucket; later callers wait off the debt
+                        self.tokens -= amount
+                        return
+                    self.cond.wait(max(-self.tokens / self.rate, 0.01))
+            finally:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
+
+class StalledDownload(requests.ConnectionError):
+    """A transfer that is still alive but too slow to be worth waiting on while other sources exist"""
+
+class MirrorSet:
+    """Hosts serving the same paths as the primary base URL, ranked by measured latency and throughput.
+
+    Downloads from mirrors are hash-checked, so a mirror serving bad data only costs a
+    retry elsewhere; its ranking drops with every failure.
+    """
+    SAMPLE_BYTES = 256 * 1024
+    TYPICAL_FILE = 1024 * 1024
+
+    def __init__(self, primary, mirrors=(), probe_timeout=3.0):
+        self.primary = primary.rstrip("/")
+        self.probe_timeout = probe_timeout
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.throughput = {}
+        self.failures = collections.Counter()
+        self.set_mirrors(mirrors)
+
+    def set_mirrors(self, mirrors):
+        with self.lock:
+            self.bases = list(dict.fromkeys([self.primary] + [m.rstrip("/") for m in mirrors]))
+
+    def probe(self, session, relative_path):
+        """Times a sample of relative_path from every host in parallel and returns the new ranking"""
+        def measure(base):
+            start = time.monotonic()
+            first_byte = None
+            received = 0
+            try:
+                with session.get(f"{base}/{relative_path}", stream=True, timeout=self.probe_timeout,
+                                 headers={"Accept-Encoding": "identity"}) as r:
+                    r.raise_for_status()
+                    for chunk in r.iter_content(chunk_size=16384):
+                        first_byte = first_byte or time.monotonic()
+                        received += len(chunk)
+                        if received >= self.SAMPLE_BYTES:
+                            break
+            except requests.RequestException as e:
+                print(f"Mirror {base} unavailable: {e}")
+                return base, None, None
+            end = time.monotonic()
+            return base, (first_byte or end) - start, received / max(end - start, 1e-3)
+
+        with ThreadPoolExecutor(max_workers=len(self.bases)) as pool:
+            results = list(pool.map(measure, list(self.bases)))
+        with self.lock:
+            for base, latency, rate in results:
+                self.latency[base] = latency
+                if rate:
+                    self.throughput[base] = rate
+        return self.ranked()
+
+    def ranked(self):
+        """Reachable hosts, fastest first; hosts not probed yet keep their configured order at the end"""
+        with self.lock:
+            def expected_time(base):
+                if base not in self.latency:
+                    return float("inf")
+                seconds = self.latency[base] + self.TYPICAL_FILE / self.throughput.get(base, self.TYPICAL_FILE)
+                return seconds * 2 ** self.failures[base]
+            reachable = [b for b in self.bases if b not in self.latency or self.latency[b] is not None]
+            return sorted(reachable, key=expected_time)
+
+    def base_of(self, url):
+        return next((b for b in self.bases if url.startswith(b + "/")), None)
+
+    def alternatives(self, url):
+        """The same file on every ranked host, or nothing if url is not under the primary base"""
+        if not url.startswith(self.primary + "/"):
+            return []
+        rest = url[len(self.primary):]
+        return [base + rest for base in self.ranked()]
+
+    def record(self, url, nbytes, seconds):
+        base = self.base_of(url)
+        if base is None or seconds <= 0:
+            return
+        with self.lock:
+            rate = nbytes / seconds
+            self.throughput[base] = 0.7 * self.throughput.get(base, rate) + 0.3 * rate
+            self.failures[base] = max(self.failures[base] - 1, 0)
+
+    def fail(self, url):
+        base = self.base_of(url)
+        if base is not None:
+            with self.lock:
+                self.failures[base] += 1
+
+class DownloadEngine:
+    """Pooled, bounded-concurrency downloader shared by the updater"""
+    PRIORITY_CRITICAL = 0  # classpath libraries and the version jar
+    PRIORITY_MODS = 1
+    PRIORITY_OPTIONAL = 2  # assets, config and everything else
+
+    def __init__(self, max_workers=8, per_host=4, chunk_size=65536, timeout=30, retries=5, journal=None,
+                 progress=None, stall_rate=16384, stall_window=10.0):
+        self.limiter = BandwidthLimiter()
+        self.progress = progress
+        self.mirrors = None
+        self.stall_rate = stall_rate
+        self.stall_window = stall_window
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.journal = journal
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+    def host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_slots[host]
+
+    def download(self, url, path, sha256=None, git_sha=None, size=None, sources=(), priority=PRIORITY_OPTIONAL):
+        """Streams url to path through a .part file, verifying sha256 or a git blob SHA if given.
+
+        An interrupted transfer is retried with a Range request, continuing from the
+        bytes already in the .part file, including ones left over from a previous run.
+        Alternative sources are tried once each before url; the checksum makes them safe.
+        A source that stalls is abandoned for the next one, which resumes from its bytes.
+        """
+        for source in sources:
+            try:
+                return self.download_from(source, path, sha256, git_sha, size, 0, priority, detect_stall=True)
+            except (requests.RequestException, ValueError) as e:
+                if self.mirrors:
+                    self.mirrors.fail(source)
+                print(f"Source {source} failed, trying next: {e}")
+        return self.download_from(url, path, sha256, git_sha, size, self.retries, priority)
+
+    def download_from(self, url, path, sha256, git_sha, size, retries, priority, detect_stall=False):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".part")
+        expected = git_sha or sha256
+
+        entry = self.journal.get(temp_path) if self.journal else {}
+        same_content = entry.get("expected") == expected and (expected or entry.get("url") == url)
+        if not same_content or not temp_path.exists():
+            temp_path.unlink(missing_ok=True)
+            entry = {"url": url, "expected": expected, "etag": None}
+        elif entry.get("url") != url:
+            entry = {"url": url, "expected": expected, "etag": None}
+
+        started = time.monotonic()
+        start_size = temp_path.stat().st_size if temp_path.exists() else 0
+        for attempt in range(retries + 1):
+            try:
+                digest = self.fetch_part(url, temp_path, entry, git_sha, size, priority, detect_stall)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                if attempt == retries:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+
+        if expected and digest.hexdigest() != expected:
+            temp_path.unlink(missing_ok=True)
+            if self.journal:
+                self.journal.remove(temp_path)
+            if self.progress:
+                self.progress.update_file(str(temp_path), 0)
+            raise ValueError(f"Checksum mismatch for {path}")
+        if self.mirrors:
+            self.mirrors.record(url, temp_path.stat().st_size - start_size, time.monotonic() - started)
+        os.replace(temp_path, path)
+        if self.journal:
+            self.journal.remove(temp_path)
+        if self.progress:
+            self.progress.file_done(str(temp_path))
+        return path
+
+    def fetch_part(self, url, temp_path, entry, git_sha=None, size=None, priority=PRIORITY_OPTIONAL,
+                   detect_stall=False):
+        """Appends the missing tail of url to temp_path; returns the digest of the whole file"""
+        offset = temp_path.stat().st_size if temp_path.exists() else 0
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if entry.get("etag"):
+                headers["If-Range"] = entry["etag"]
+
+        with self.host_slot(url):
+            with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as r:
+                if r.status_code == 416:
+                    # Nothing left to fetch; the checksum decides whether the part file is good
+                    return self.part_digest(temp_path, git_sha, size)
+                r.raise_for_status()
+                if r.status_code != 206:
+                    offset = 0
+
+                entry["etag"] = r.headers.get("ETag")
+                if self.journal:
+                    self.journal.record(temp_path, entry)
+
+                digest = self.part_digest(temp_path, git_sha, size) if offset else self.new_digest(git_sha, size)
+                window_start, window_bytes, throttled = time.monotonic(), 0, 0.0
+                with open(temp_path, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=self.chunk_size):
+                        before = time.monotonic()
+                        self.limiter.consume(len(chunk), priority)
+                        throttled += time.monotonic() - before
+                        digest.update(chunk)
+                        f.write(chunk)
+                        offset += len(chunk)
+                        if self.progress:
+                            self.progress.update_file(str(temp_path), offset)
+                        if detect_stall:
+                            # Time spent waiting on our own bandwidth cap is not the source's fault
+                            window_bytes += len(chunk)
+                            elapsed = time.monotonic() - window_start - throttled
+                            if elapsed >= self.stall_window:
+                                if window_bytes / elapsed < self.stall_rate:
+                                    raise StalledDownload(f"{url} slowed to {window_bytes / elapsed / 1024:.1f} KB/s")
+                                window_start, window_bytes, throttled = time.monotonic(), 0, 0.0
+        return digest
+
+    def new_digest(self, git_sha=None, size=None):
+        if git_sha:
+            return hashlib.sha1(f"blob {size}\0".encode())
+        return hashlib.sha256()
+
+    def part_digest(self, temp_path, git_sha=None, size=None):
+        digest = self.new_digest(git_sha, size)
+        with open(temp_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest
+
+    def download_many(self, jobs):
+        """Runs jobs (keyword arguments for download) in parallel, most urgent first; raises the first failure"""
+        jobs = sorted(jobs, key=lambda job: job.get("priority", self.PRIORITY_OPTIONAL))
+        if self.progress:
+            self.progress.add_work(len(jobs), sum(job.get("size") or 0 for job in jobs))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self.download, **job) for job in jobs]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def close(self):
+        self.session.close()
+
+class QueueReader(io.RawIOBase):
+    """Read-only file object over byte chunks that another thread puts on a queue"""
+
+    def __init__(self, chunks, stop):
+        self.chunks = chunks
+        self.stop = stop
+        self.buffer = memoryview(b"")
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.buffer and not self.done:
+            try:
+                chunk = self.chunks.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop.is_set():
+                    raise RuntimeError("Pack download was cancelled")
+                continue
+            if chunk is None:
+                self.done = True
+            elif isinstance(chunk, Exception):
+                raise chunk
+            else:
+                self.buffer = memoryview(chunk)
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+class PackExtractor:
+    """Downloads a tar pack and unpacks it while it is still arriving.
+
+    The network, decompression and disk writes run as three threads joined by bounded
+    queues, so memory stays flat however large the pack is.
+    """
+
+    def __init__(self, downloader, chunk_size=262144, depth=32):
+        self.downloader = downloader
+        self.chunk_size = chunk_size
+        self.depth = depth
+
+    def extract(self, url, root):
+        stop = threading.Event()
+        chunks = queue.Queue(maxsize=self.depth)
+        writes = queue.Queue(maxsize=self.depth)
+        errors = []
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    pass
+
+        def fetch():
+            try:
+                received = 0
+                progress = self.downloader.progress
+                with self.downloader.host_slot(url):
+                    with self.downloader.session.get(url, stream=True, timeout=self.downloader.timeout) as r:
+                        r.raise_for_status()
+                        for chunk in r.iter_content(chunk_size=self.chunk_size):
+                            if stop.is_set():
+                                return
+                            self.downloader.limiter.consume(len(chunk), DownloadEngine.PRIORITY_CRITICAL)
+                            put(chunks, chunk)
+                            received += len(chunk)
+                            if progress:
+                                progress.update_file(url, received)
+                if progress:
+                    progress.file_done(url)
+                put(chunks, None)
+            except Exception as e:
+                put(chunks, e)
+
+        def write():
+            f = None
+            try:
+                while True:
+                    try:
+                        item = writes.get(timeout=0.5)
+                    except queue.Empty:
+                        if stop.is_set():
+                            return
+                        continue
+                    if item is None:
+                        return
+                    path, data = item
+                    if data is None:
+                        f.close()
+                        f = None
+                    elif f is None:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        # Never write through a hardlink shared with the live install
+                        path.unlink(missing_ok=True)
+                        f = open(path, "wb")
+                        f.write(data)
+                    else:
+                        f.write(data)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                if f is not None:
+                    f.close()
+
+        fetcher = threading.Thread(target=fetch, daemon=True)
+        writer = threading.Thread(target=write, daemon=True)
+        fetcher.start()
+        writer.start()
+        try:
+            with tarfile.open(fileobj=QueueReader(chunks, stop), mode="r|*") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    path = UpdateManager.manifest_path(root, member.name)
+                    source = tar.extractfile(member)
+                    put(writes, (path, source.read(self.chunk_size) or b""))
+                    for data in iter(lambda: source.read(self.chunk_size), b""):
+                        put(writes, (path, data))
+                    put(writes, (path, None))
+                    if stop.is_set():
+                        break
+            put(writes, None)
+        except Exception:
+            stop.set()
+            raise
+        finally:
+            writer.join()
+            stop.set()
+            fetcher.join()
+        if errors:
+            raise errors[0]
+
+class ChunkStore:
+    """Content-addressed store of file chunks cut by a gear rolling hash.
+
+    Chunk boundaries depend only on nearby content, so a rebuilt jar shares most of its
+    chunks with the previous build and only the new ones have to be fetched.
+    """
+    MIN_SIZE = 16 * 1024
+    MAX_SIZE = 256 * 1024
+    MASK = 0xFFFF0000  # 16 bits set: ~64 KB average chunks
+    GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "little") for i in range(256)]
+    # Byte k of every gear value, as translate() tables
+    GEAR_PLANES = list(map(bytes, zip(*(g.to_bytes(4, "little") for g in GEAR))))
+    WINDOW = 32
+    SCAN_BLOCK = 1024 * 1024
+    KEEP_INDEXES = 2
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.scan_rate = 8 * 1024 * 1024  # bytes/s, refined by every ingest
+
+    @staticmethod
+    def window_hits(data):
+        """Offsets i where the hash of the WINDOW bytes ending at i has its mask bits clear.
+
+        Bits shifted past 32 are dropped, so after WINDOW steps the gear hash only depends on
+        the last WINDOW bytes. Each block is packed into one integer with a 64-bit slot per
+        byte; five shift-adds then leave every slot holding its window hash.
+        """
+        hits = []
+        overlap = ChunkStore.WINDOW - 1
+        for first in range(overlap, len(data), ChunkStore.SCAN_BLOCK):
+            window = data[first - overlap:first + ChunkStore.SCAN_BLOCK]
+            slots = bytearray(8 * len(window))
+            for k, plane in enumerate(ChunkStore.GEAR_PLANES):
+                slots[k::8] = window.translate(plane)
+            value = int.from_bytes(slots, "little")
+            for shift in (65, 130, 260, 520, 1040):
+                value += value << shift
+            packed = value.to_bytes(8 * len(window) + 256, "little")[:8 * len(window)]
+            masked = (int.from_bytes(packed[2::8], "little") | int.from_bytes(packed[3::8], "little"))
+            masked = masked.to_bytes(len(window), "little")
+            i = masked.find(0, overlap)
+            while i != -1:
+                hits.append(first - overlap + i)
+                i = masked.find(0, i + 1)
+        return hits
+
+    @staticmethod
+    def boundaries(data):
+        """Returns the chunk end offsets of data"""
+        gear, mask = ChunkStore.GEAR, ChunkStore.MASK
+        hits = ChunkStore.window_hits(data)
+        cuts = []
+        start, size = 0, len(data)
+        while start < size:
+            end = min(start + ChunkStore.MAX_SIZE, size)
+            cut = end
+            h = 0
+            # Until the hash has seen a full window it differs from window_hits, so step it by hand
+            first = start + ChunkStore.MIN_SIZE
+            for i in range(first, min(first + ChunkStore.WINDOW - 1, end)):
+                h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+                if not h & mask:
+                    cut = i + 1
+                    break
+            else:
+                n = bisect.bisect_left(hits, first + ChunkStore.WINDOW - 1)
+                if n < len(hits) and hits[n] < end:
+                    cut = hits[n] + 1
+            cuts.append(cut)
+            start = cut
+        return cuts
+
+    @staticmethod
+    def chunk_list(data):
+        chunks, start = [], 0
+        for end in ChunkStore.boundaries(data):
+            chunks.append([hashlib.sha256(data[start:end]).hexdigest(), end - start])
+            start = end
+        return chunks
+
+    @staticmethod
+    def build_index(root, version, min_size=1024 * 1024):
+        """Builds the chunk index published alongside a modpack release"""
+        root = Path(root)
+        files = {}
+        for file_path in sorted(p for p in root.rglob("*") if p.is_file() and p.stat().st_size >= min_size):
+            data = file_path.read_bytes()
+            files[file_path.relative_to(root).as_posix()] = {
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "size": len(data),
+                "chunks": ChunkStore.chunk_list(data)
+            }
+        return {"version": version, "files": files}
+
+    def chunk_path(self, digest):
+        return self.path / digest[:2] / digest
+
+    def has(self, digest):
+        return self.chunk_path(digest).exists()
+
+    def put(self, digest, data):
+        path = self.chunk_path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{digest}.{threading.get_ident()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def ingest(self, file_path):
+        """Adds the chunks of a local file to the store"""
+        data = Path(file_path).read_bytes()
+        started = time.monotonic()
+        cuts = self.boundaries(data)
+        seconds = time.monotonic() - started
+        if seconds > 0 and len(data) >= self.MAX_SIZE:
+            self.scan_rate = 0.7 * self.scan_rate + 0.3 * len(data) / seconds
+        start = 0
+        for end in cuts:
+            piece = data[start:end]
+            self.put(hashlib.sha256(piece).hexdigest(), piece)
+            start = end
+
+    def rebuild(self, entry, url, path, session, sha256, limiter=None, priority=None, progress=None):
+        """Assembles path from stored chunks, fetching missing runs with Range requests"""
+        offsets, offset = [], 0
+        for digest, size in entry["chunks"]:
+            offsets.append((offset, digest, size))
+            offset += size
+
+        missing = [c for c in offsets if not self.has(c[1])]
+        runs = []
+        for chunk in missing:
+            if runs and runs[-1][-1][0] + runs[-1][-1][2] == chunk[0]:
+                runs[-1].append(chunk)
+            else:
+                runs.append([chunk])
+
+        if progress:
+            progress.add_work(1, sum(size for _, _, size in missing))
+        received = 0
+        for run in runs:
+            first, last = run[0][0], run[-1][0] + run[-1][2] - 1
+            response = session.get(url, headers={"Range": f"bytes={first}-{last}", "Accept-Encoding": "identity"},
+                                   timeout=30)
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise ValueError("Server does not support range requests")
+            body = response.content
+            if limiter:
+                limiter.consume(len(body), priority)
+            received += len(body)
+            if progress:
+                progress.update_file(url, received)
+            for chunk_offset, digest, size in run:
+                piece = body[chunk_offset - first:chunk_offset - first + size]
+                if hashlib.sha256(piece).hexdigest() != digest:
+                    raise ValueError(f"Chunk checksum mismatch for {path}")
+                self.put(digest, piece)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".part")
+        digest = hashlib.sha256()
+        with open(temp_path, "wb") as f:
+            for _, chunk_digest, _ in offsets:
+                piece = self.chunk_path(chunk_digest).read_bytes()
+                digest.update(piece)
+                f.write(piece)
+        if digest.hexdigest() != sha256:
+            temp_path.unlink(missing_ok=True)
+            raise ValueError(f"Checksum mismatch for {path}")
+        os.replace(temp_path, path)
+        if progress:
+            progress.file_done(url)
+        return len(missing)
+
+    def load_index(self, tag):
+        """The remembered chunk index of release tag, or None"""
+        try:
+            with open(self.path / "indexes" / f"{tag}.json", "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def holds(self, entry, file_path):
+        """True when file_path is the file entry describes and all of its chunks are stored"""
+        return (entry is not None and file_path.stat().st_size == entry["size"]
+                and all(self.has(digest) for digest, _ in entry["chunks"])
+                and UpdateManager.hash_file(file_path) == entry["sha256"])
+
+    def remember_index(self, tag, index):
+        """Keeps the chunk indexes of recent releases and drops chunks none of them use"""
+        indexes = self.path / "indexes"
+        indexes.mkdir(parents=True, exist_ok=True)
+        with open(indexes / f"{tag}.json", "w") as f:
+            json.dump(index, f)
+
+        kept = sorted(indexes.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in kept[self.KEEP_INDEXES:]:
+            old.unlink()
+        referenced = set()
+        for index_path in kept[:self.KEEP_INDEXES]:
+            with open(index_path, "r") as f:
+                for entry in json.load(f)["files"].values():
+                    referenced.update(digest for digest, _ in entry["chunks"])
+        for chunk_path in self.path.glob("??/*"):
+            if chunk_path.name not in referenced:
+                chunk_path.unlink(missing_ok=True)
+
+class BinaryPatch:
+    """Block-matching binary delta between two builds of the same file.
+
+    A patch is a header (magic, sha256 of source and target, target size) followed by
+    COPY (offset, length into the source) and ADD (literal bytes) operations.
+    """
+    MAGIC = b"RBCPATCH1"
+    BLOCK = 64
+    COPY = b"C"
+    ADD = b"A"
+
+    @staticmethod
+    def create(source, target):
+        block = BinaryPatch.BLOCK
+        index = {}
+        for offset in range(0, len(source) - block + 1, block):
+            index.setdefault(source[offset:offset + block], offset)
+
+        ops = []
+        literal_start = i = 0
+        while i <= len(target) - block:
+            offset = index.get(target[i:i + block])
+            if offset is None:
+                i += 1
+                continue
+            # Grow the match backwards into the pending literal, then forwards
+            start = i
+            while start > literal_start and offset > 0 and target[start - 1] == source[offset - 1]:
+                start -= 1
+                offset -= 1
+            end, source_end = i + block, offset + (i + block - start)
+            while (end + block <= len(target) and source_end + block <= len(source)
+                   and target[end:end + block] == source[source_end:source_end + block]):
+                end += block
+                source_end += block
+            while end < len(target) and source_end < len(source) and target[end] == source[source_end]:
+                end += 1
+                source_end += 1
+
+            if start > literal_start:
+                ops.append(BinaryPatch.ADD + struct.pack("<Q", start - literal_start) + target[literal_start:start])
+            ops.append(BinaryPatch.COPY + struct.pack("<QQ", offset, end - start))
+            literal_start = i = end
+        if literal_start < len(target):
+            ops.append(BinaryPatch.ADD + struct.pack("<Q", len(target) - literal_start) + target[literal_start:])
+
+        header = (BinaryPatch.MAGIC + hashlib.sha256(source).digest() + hashlib.sha256(target).digest()
+                  + struct.pack("<Q", len(target)))
+        return header + b"".join(ops)
+
+    @staticmethod
+    def apply(source, patch):
+        """Rebuilds the target, raising ValueError if either side fails its checksum"""
+        magic_len = len(BinaryPatch.MAGIC)
+        if patch[:magic_len] != BinaryPatch.MAGIC:
+            raise ValueError("Not a launcher patch")
+        source_hash = patch[magic_len:magic_len + 32]
+        target_hash = patch[magic_len + 32:magic_len + 64]
+        (target_size,) = struct.unpack_from("<Q", patch, magic_len + 64)
+        if hashlib.sha256(source).digest() != source_hash:
+            raise ValueError("Patch does not apply to the installed version")
+
+        out = bytearray()
+        pos = magic_len + 72
+        while pos < len(patch):
+            op = patch[pos:pos + 1]
+            if op == BinaryPatch.COPY:
+                offset, length = struct.unpack_from("<QQ", patch, pos + 1)
+                out += source[offset:offset + length]
+                pos += 17
+            elif op == BinaryPatch.ADD:
+                (length,) = struct.unpack_from("<Q", patch, pos + 1)
+                out += patch[pos + 9:pos + 9 + length]
+                pos += 9 + length
+            else:
+                raise ValueError("Corrupt launcher patch")
+
+        if len(out) != target_size or hashlib.sha256(out).digest() != target_hash:
+            raise ValueError("Patched launcher failed verification")
+        return bytes(out)
+
+class PeerRequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/ping":
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        file_path = None
+        if self.path.startswith("/files/"):
+            file_path = self.server.peer.lookup(self.path[len("/files/"):])
+        if file_path is None:
+            self.send_error(404)
+            return
+        with open(file_path, "rb") as f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+
+class PeerServer:
+    """Shares the installed modpack with other launchers on the LAN, addressed by sha256"""
+    DISCOVERY_PORT = 47625
+    QUERY = b"RBC-PEER?"
+
+    def __init__(self, update_manager, port=0):
+        self.update_manager = update_manager
+        self.instance_id = os.urandom(8).hex()
+        self.httpd = http.server.ThreadingHTTPServer(("", port), PeerRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.peer = self
+        self.udp = None
+        self.files = {}
+        self.files_version = None
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        try:
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.udp.bind(("", self.DISCOVERY_PORT))
+            threading.Thread(target=self.answer_discovery, daemon=True).start()
+        except OSError as e:
+            print(f"LAN peer discovery unavailable: {e}")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.udp:
+            self.udp.close()
+
+    def answer_discovery(self):
+        while True:
+            try:
+                data, address = self.udp.recvfrom(64)
+            except OSError:
+                return
+            if data == self.QUERY:
+                self.udp.sendto(f"RBC-PEER {self.port} {self.instance_id}".encode(), address)
+
+    def lookup(self, sha256):
+        """Returns the live path of the installed file with this hash, if it is intact"""
+        version = self.update_manager.current_version["modpack"]
+        with self.lock:
+            if version != self.files_version:
+                manifest = self.update_manager.load_release_manifest(version) or {"files": []}
+                self.files = {entry["sha256"]: entry for entry in manifest["files"]}
+                self.files_version = version
+            entry = self.files.get(sha256)
+        if entry is None:
+            return None
+        root = Path(self.update_manager.MODPACK_DIR)
+        # Unchanged files are answered from the index; anything touched since is hashed again
+        if self.update_manager.file_index.verify(root, [entry]):
+            return None
+        return UpdateManager.manifest_path(root, entry["path"])
+
+    @staticmethod
+    def discover(addresses=("<broadcast>",), timeout=1.0, exclude=None):
+        """Returns base URLs of launchers answering on the LAN"""
+        peers = {}
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            s.settimeout(timeout)
+            for address in addresses:
+                try:
+                    s.sendto(PeerServer.QUERY, (address, PeerServer.DISCOVERY_PORT))
+                except OSError as e:
+                    print(f"Peer discovery on {address} failed: {e}")
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                try:
+                    data, (host, _) = s.recvfrom(64)
+                except (socket.timeout, OSError):
+                    break
+                parts = data.decode(errors="replace").split()
+                # A peer answers once per interface; keep the first address it answered from
+                if len(parts) == 3 and parts[0] == "RBC-PEER" and parts[2] != exclude:
+                    peers.setdefault(parts[2], f"http://{host}:{parts[1]}")
+        return list(peers.values())
+
+class FileIndex:
+    """Remembers the size, mtime and hashes of installed files so unchanged ones need not be re-hashed"""
+
+    def __init__(self, path, workers=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers or min(8, (os.cpu_count() or 2))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT,
+                git_sha TEXT
+            )
+        ''')
+        self.conn.commit()
+
+    def lookup(self, file_path, stat):
+        """Returns the indexed row for the file if its size and mtime are unchanged"""
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns, sha256, git_sha FROM files WHERE path = ?",
+                                    (str(file_path),)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return {"sha256": row[2], "git_sha": row[3]}
+        return None
+
+    def record(self, rows):
+        """Stores (path, stat, sha256, git_sha) rows; a missing hash is kept from the old row if stats match"""
+        with self.lock:
+            self.conn.executemany('''
+                INSERT INTO files (path, size, mtime_ns, sha256, git_sha) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    sha256 = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns
+                                  THEN COALESCE(excluded.sha256, sha256) ELSE excluded.sha256 END,
+                    git_sha = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns
+                                   THEN COALESCE(excluded.git_sha, git_sha) ELSE excluded.git_sha END,
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns
+            ''', [(str(p), st.st_size, st.st_mtime_ns, sha256, git_sha) for p, st, sha256, git_sha in rows])
+            self.conn.commit()
+
+    def forget(self, paths):
+        with self.lock:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(str(p),) for p in paths])
+            self.conn.commit()
+
+    def record_verified(self, root, entries):
+        """Indexes files that were just checked against the given manifest entries"""
+        rows = []
+        for entry in entries:
+            file_path = UpdateManager.manifest_path(root, entry["path"])
+            try:
+                rows.append((file_path.resolve(), file_path.stat(), entry.get("sha256"), entry.get("git_sha")))
+            except OSError:
+                pass
+        self.record(rows)
+
+    def verify(self, root, entries, progress=None):
+        """Returns the entries whose file under root is missing or does not match its hash"""
+        kind = lambda entry: "git_sha" if "git_sha" in entry else "sha256"
+        bad, to_hash = [], []
+        for entry in entries:
+            file_path = UpdateManager.manifest_path(root, entry["path"]).resolve()
+            try:
+                stat = file_path.stat()
+            except OSError:
+                bad.append(entry)
+                continue
+            if stat.st_size != entry["size"]:
+                bad.append(entry)
+                continue
+            known = self.lookup(file_path, stat)
+            if known and known[kind(entry)]:
+                if known[kind(entry)] != entry[kind(entry)]:
+                    bad.append(entry)
+                continue
+            to_hash.append((entry, file_path, stat))
+
+        if progress:
+            progress.add_work(len(to_hash), sum(stat.st_size for _, _, stat in to_hash))
+
+        def check(item):
+            entry, file_path, stat = item
+            digest = self.hash_mapped(file_path, git=kind(entry) == "git_sha")
+            if progress:
+                progress.update_file(str(file_path), stat.st_size)
+                progress.file_done(str(file_path))
+            return entry, file_path, stat, digest
+
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for entry, file_path, stat, digest in pool.map(check, to_hash):
+                if digest != entry[kind(entry)]:
+                    bad.append(entry)
+                rows.append((file_path, stat, *((None, digest) if kind(entry) == "git_sha" else (digest, None))))
+        self.record(rows)
+        return bad
+
+    @staticmethod
+    def hash_mapped(path, git=False):
+        """Hashes a file through a read-only memory map; hashlib drops the GIL so threads hash in parallel"""
+        size = os.path.getsize(path)
+        digest = hashlib.sha1(f"blob {size}\0".encode()) if git else hashlib.sha256()
+        if size:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, 64 * 1024 * 1024):
+                        digest.update(view[offset:offset + 64 * 1024 * 1024])
+                finally:
+                    view.release()
+        return digest.hexdigest()
+
+class UpdatePlanner:
+    """Finds the cheapest way, in bytes, from one modpack version to another.
+
+    Edges are the ways to move between versions (chained deltas, full packs, a file-by-file
+    sync) and are weighted by the bytes they download; the route is found with Dijkstra.
+    """
+
+    def __init__(self):
+        self.edges = collections.defaultdict(list)
+
+    def add_edge(self, source, target, size, **step):
+        self.edges[source].append(dict(step, source=source, target=target, size=size))
+
+    def cheapest(self, start, goal):
+        """Returns (total bytes, steps) for the cheapest route, or None if goal is unreachable"""
+        # Ties go to the route with fewer steps
+        best = {start: (0, 0)}
+        previous = {}
+        heap = [(0, 0, start)]
+        while heap:
+            cost, hops, node = heapq.heappop(heap)
+            if node == goal:
+                steps = []
+                while node != start:
+                    steps.append(previous[node])
+                    node = previous[node]["source"]
+                return cost, steps[::-1]
+            if (cost, hops) > best[node]:
+                continue
+            for edge in self.edges.get(node, ()):
+                candidate = (cost + edge["size"], hops + 1)
+                if edge["target"] not in best or candidate < best[edge["target"]]:
+                    best[edge["target"]] = candidate
+                    previous[edge["target"]] = edge
+                    heapq.heappush(heap, (*candidate, edge["target"]))
+        return None
+
 class UpdateManager:
     def __init__(self, app):
         self.app = app
@@ -24,8 +1298,34 @@ class UpdateManager:
         self.LAUNCHER_EXE = "RBCLauncher.exe"
         self.MODPACK_DIR = "Minecraft/game"
         self.current_version = self.load_version()
+        self.MANIFEST_ASSET = "manifest.json"
+        self.PACK_PREFIX = "modpack-pack"
+        self.CHUNK_INDEX_ASSET = "chunks.json"
+        self.DELTA_INDEX_ASSET = "deltas.json"
         self.headers = {"Accept": "application/vnd.github.v3+json"}
         self.update_base_url = f"https://api.github.com/repos/{self.REPO}"
+        self.raw_base_url = f"https://raw.githubusercontent.com/{self.REPO}"
+        self.progress = UpdateProgress()
+        self.downloader = DownloadEngine(journal=DownloadJournal(MinecraftLauncher.APP_DATA_DIR / "downloads.json"),
+                                         progress=self.progress)
+        self.session = self.downloader.session
+        self.governor = RateLimitGovernor(urlsplit(self.update_base_url).netloc)
+        self.session.hooks["response"].append(self.governor.observe)
+        self.check_lock = threading.Lock()
+        self.pending_check = None
+        self.last_check = None
+        self.mirrors = MirrorSet(self.raw_base_url)
+        self.downloader.mirrors = self.mirrors
+        self.http_cache = HttpCache(MinecraftLauncher.APP_DATA_DIR / "http_cache.json")
+        self.chunk_store = ChunkStore(MinecraftLauncher.APP_DATA_DIR / "chunks")
+        self.file_index = FileIndex(MinecraftLauncher.APP_DATA_DIR / "file_index.db")
+        self.peer_server = None
+        self.peers = []
+        self.update_lock = threading.RLock()
+        self.staged_launcher = None
+        self.rate_lock = threading.Lock()
+        self.foreground_updates = 0
+        self.recover_modpack()
 
     def load_version(self):
         try:
@@ -37,27 +1337,76 @@ class UpdateManager:
     def save_version(self):
         with open("version.json", "w") as f:
             json.dump(self.current_version, f)
+        # A check made against the old versions would offer the update that was just installed
+        with self.check_lock:
+            self.last_check = None
+
+    CHECK_REUSE = 30
 
     def check_updates(self):
+        """Returns (updates, release); callers arriving while a check is running share its result"""
+        with self.check_lock:
+            if self.last_check and time.monotonic() - self.last_check[0] < self.CHECK_REUSE:
+                return self.last_check[1]
+            pending = self.pending_check
+            owner = pending is None
+            if owner:
+                pending = self.pending_check = {"done": threading.Event(), "result": (None, None)}
+        if not owner:
+            pending["done"].wait()
+            return pending["result"]
+
+        installed = dict(self.current_version)
         try:
-            response = requests.get(f"{self.update_base_url}/releases/latest", headers=self.headers)
-            response.raise_for_status()
-            latest_release = response.json()
-            
+            pending["result"] = self.request_updates()
+        finally:
+            with self.check_lock:
+                self.pending_check = None
+                if pending["result"][0] is not None and self.current_version == installed:
+                    self.last_check = (time.monotonic(), pending["result"])
+            pending["done"].set()
+        return pending["result"]
+
+    def request_updates(self):
+        try:
+            self.governor.acquire(essential=False)
+            latest_release, unchanged = self.http_cache.get_json(
+                self.session, f"{self.update_base_url}/releases/latest", self.headers)
+
             version_content = next(a for a in latest_release["assets"] if a["name"] == "version.json")
-            version_response = requests.get(version_content["browser_download_url"])
-            latest_version = version_response.json()
+            # An unchanged release has the same assets, so its version.json needs no request at all
+            latest_version = self.http_cache.lookup(version_content["browser_download_url"]) if unchanged else None
+            if latest_version is None:
+                latest_version, _ = self.http_cache.get_json(self.session, version_content["browser_download_url"])
             
-            updates = {
-                "launcher": latest_version["launcher"] != self.current_version["launcher"],
-                "modpack": latest_version["modpack"] != self.current_version["modpack"]
-            }
-            return updates, latest_release
+            return self.compare_versions(latest_version), latest_release
+        except RateLimited as e:
+            print(f"Update check deferred: {e}")
+            return self.cached_updates()
         except Exception as e:
             print(f"Update check failed: {e}")
             return None, None
 
+    def compare_versions(self, latest_version):
+        return {
+            "launcher": latest_version["launcher"] != self.current_version["launcher"],
+            "modpack": latest_version["modpack"] != self.current_version["modpack"]
+        }
+
+    def cached_updates(self):
+        """The last release seen, from the HTTP cache, for when GitHub cannot be asked"""
+        latest_release = self.http_cache.lookup(f"{self.update_base_url}/releases/latest")
+        if latest_release is None:
+            return None, None
+        version_content = next((a for a in latest_release["assets"] if a["name"] == "version.json"), None)
+        latest_version = self.http_cache.lookup(version_content["browser_download_url"]) if version_content else None
+        if latest_version is None:
+            return None, None
+        return self.compare_versions(latest_version), latest_release
+
     def perform_update(self, updates, release):
+        """Returns True if the launcher must restart, False if not, and None if the update failed"""
+        self.begin_foreground()
         try:
             if updates["modpack"]:
                 self.update_modpack(release)
@@ -66,39 +1415,591 @@ class UpdateManager:
                 self.update_launcher(release)
                 return True
                 
-            if updates["modpack"]:
-                self.current_version["modpack"] = release["tag_name"]
-                self.save_version()
-                
             return False
         except Exception as e:
-            messagebox.showerror("Update Error", f"Update failed: {str(e)}")
-            return False
+            self.progress.finish("Update failed")
+            if self.app is None:
+                print(f"Update failed: {e}")
+            else:
+                messagebox.showerror("Update Error", f"Update failed: {str(e)}")
+            return None
+        finally:
+            self.end_foreground()
+
+    def begin_foreground(self):
+        """Lifts the background bandwidth cap for as long as the user waits on an update.
+
+        A background stage already running keeps downloading, but at full speed, so an update
+        queued behind it on the update lock is not held to the background rate.
+        """
+        with self.rate_lock:
+            self.foreground_updates += 1
+            self.downloader.limiter.set_rate(None)
+
+    def end_foreground(self):
+        with self.rate_lock:
+            self.foreground_updates -= 1
+
+    def cap_background(self, capped):
+        """Applies the background bandwidth cap, unless the user is waiting on an update"""
+        with self.rate_lock:
+            self.downloader.limiter.set_rate(self.background_rate() if capped and not self.foreground_updates else None)
 
     def update_modpack(self, release):
-        response = requests.get(f"{self.update_base_url}/contents/{self.MODPACK_DIR}",
-                              headers=self.headers, params={"ref": release["tag_name"]})
+        with self.update_lock:
+            if self.stage_modpack(release) is not None:
+                self.activate_staged_modpack()
+
+    def staging_paths(self):
+        live = Path(self.MODPACK_DIR)
+        return live, live.parent / ".staging", live.parent / ".staging.json", live.parent / ".snapshots"
+
+    def load_stage_state(self):
+        try:
+            with open(self.staging_paths()[2], "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_stage_state(self, state):
+        with open(self.staging_paths()[2], "w") as f:
+            json.dump(state, f)
+
+    def stage_modpack(self, release):
+        """Builds the release next to the live modpack without touching it; None if it is already installed"""
+        live, staging, _, _ = self.staging_paths()
+        tag = release["tag_name"]
+        if tag == self.current_version["modpack"]:
+            print(f"Modpack {tag} is already installed")
+            return None
+        state = self.load_stage_state()
+        if state.get("tag") == tag and state.get("ready") and staging.is_dir():
+            return staging
+        if state.get("tag") != tag and staging.exists():
+            shutil.rmtree(staging)
+
+        live.parent.mkdir(parents=True, exist_ok=True)
+        self.progress.reset("Downloading modpack")
+        fresh = not live.is_dir() or not any(live.iterdir())
+        self.save_stage_state({"tag": tag, "ready": False})
+        if not fresh:
+            self.link_tree(live, staging)
+
+        manifest = self.fetch_manifest(release)
+        packs = [a for a in release.get("assets", []) if a["name"].startswith(self.PACK_PREFIX)]
+        if manifest is not None:
+            steps = self.plan_update(release, manifest, packs, fresh)
+        else:
+            steps = [{"kind": "packs", "assets": packs}] if packs and (fresh or self.is_major_jump(tag)) else []
+        # A resumed stage replans the same route, so steps already applied can be skipped
+        done = state.get("steps_done", 0) if state.get("tag") == tag else 0
+        for number, step in enumerate(steps[done:], done + 1):
+            self.apply_step(step, staging)
+            self.save_stage_state({"tag": tag, "ready": False, "steps_done": number})
+
+        # Packs and deltas are only a bulk prefill; the diff below verifies them and repairs any gaps
+        if manifest is None:
+            blobs = self.fetch_tree(release)
+            prefix_len = len(self.MODPACK_DIR.rstrip("/")) + 1
+            self.prune_stage(staging, {item["path"][prefix_len:] for item in blobs})
+            jobs = self.diff_tree(blobs, staging, release)
+        else:
+            self.prune_stage(staging, {entry["path"] for entry in manifest["files"]})
+            self.save_release_manifest(tag, manifest)
+            entries = self.diff_manifest(manifest, staging)
+            if entries:
+                self.peers = self.find_peers()
+            chunk_index = self.fetch_release_json(release, self.CHUNK_INDEX_ASSET)
+            chunked = [e for e in entries if chunk_index and e["path"] in chunk_index["files"]]
+            chunked_paths = {e["path"] for e in chunked}
+            jobs = [self.manifest_job(release, entry, staging) for entry in entries if entry["path"] not in chunked_paths]
+            self.rebuild_chunked(release, chunked, chunk_index, staging)
+            if chunk_index:
+                self.chunk_store.remember_index(tag, chunk_index)
+        # Every download is checksum-verified and everything else was just hashed against the release
+        self.downloader.download_many(self.add_mirror_sources(jobs))
+
+        self.save_stage_state({"tag": tag, "ready": True})
+        self.progress.finish("Modpack update ready")
+        return staging
+
+    MANAGED_DIRS = ("mods", "libraries")
+
+    def prune_stage(self, root, shipped):
+        """Deletes staged files the release no longer ships: anything in the directories the pack owns
+        outright, and files the installed release shipped elsewhere. Saves and other player files stay,
+        and so do partial downloads, which a resumed stage picks up where they stopped."""
+        journal = self.downloader.journal
+        previous = self.load_release_manifest(self.current_version["modpack"])
+        candidates = [p for name in self.MANAGED_DIRS for p in (root / name).rglob("*")]
+        if previous:
+            candidates += [self.manifest_path(root, e["path"]) for e in previous["files"] if e["path"] not in shipped]
+        removed = 0
+        for file_path in candidates:
+            if not file_path.is_file() or file_path.relative_to(root).as_posix() in shipped:
+                continue
+            if file_path.name.endswith(".part") or journal and journal.get(file_path):
+                continue
+            file_path.unlink()
+            removed += 1
+        if removed:
+            print(f"Removed {removed} file(s) the release no longer ships")
+
+    def rebuild_chunked(self, release, entries, chunk_index, root):
+        """Rebuilds large files from chunks, reusing those of the copy being replaced"""
+        previous = self.chunk_store.load_index(self.current_version["modpack"]) or {"files": {}}
+        download_rate = self.mirrors.throughput.get(self.mirrors.primary)
+
+        def rebuild(entry):
+            job = self.manifest_job(release, entry, root)
+            try:
+                if job["path"].exists() and not self.chunk_store.holds(previous["files"].get(entry["path"]), job["path"]):
+                    # Scanning the old copy only pays off if it is faster than downloading all of it
+                    if download_rate and download_rate > self.chunk_store.scan_rate:
+                        self.downloader.download(**job)
+                        return
+                    self.chunk_store.ingest(job["path"])
+                self.chunk_store.rebuild(chunk_index["files"][entry["path"]], job["url"], job["path"],
+                                         self.session, entry["sha256"], self.downloader.limiter, job["priority"],
+                                         self.progress)
+            except Exception as e:
+                print(f"Chunked update of {entry['path']} failed, downloading whole file: {e}")
+                self.downloader.download(**job)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for future in as_completed([pool.submit(rebuild, entry) for entry in entries]):
+                future.result()
+
+    def extract_packs(self, packs, root):
+        extractor = PackExtractor(self.downloader)
+        self.progress.add_work(len(packs), sum(a.get("size", 0) for a in packs))
+        with ThreadPoolExecutor(max_workers=min(len(packs), 4)) as pool:
+            futures = [pool.submit(extractor.extract, a["browser_download_url"], root) for a in packs]
+            for future in as_completed(futures):
+                future.result()
+
+    def plan_update(self, release, manifest, packs, fresh):
+        """Returns the cheapest steps from the installed modpack to the release"""
+        tag = release["tag_name"]
+        current = self.current_version["modpack"]
+        planner = UpdatePlanner()
+        if packs:
+            planner.add_edge(current, tag, sum(a.get("size", 0) for a in packs), kind="packs", assets=packs)
+        planner.add_edge(current, tag, self.sync_cost(None if fresh else current, manifest,
+                                                      None if fresh else Path(self.MODPACK_DIR)), kind="sync")
+        if not fresh:
+            deltas = self.fetch_release_json(release, self.DELTA_INDEX_ASSET) or {}
+            for delta in deltas.get("deltas", []):
+                planner.add_edge(delta["from"], delta["to"], delta["size"], kind="delta",
+                                 url=delta["url"], removed=delta.get("removed", []))
+                # Stopping partway along a chain is only an option if that version's files are known
+                if delta["to"] != tag and self.load_release_manifest(delta["to"]) is not None:
+                    planner.add_edge(delta["to"], tag, self.sync_cost(delta["to"], manifest), kind="sync")
+        cost, steps = planner.cheapest(current, tag)
+        print(f"Update plan to {tag}: {' -> '.join(s['kind'] for s in steps)} ({cost / (1024 * 1024):.1f} MB)")
+        return steps
+
+    def sync_cost(self, version, manifest, root=None):
+        """Bytes a file-by-file sync from version to manifest downloads.
+
+        Without a saved manifest for version, the files under root are diffed instead; with neither,
+        everything is downloaded.
+        """
+        old = self.load_release_manifest(version) if version else None
+        if old is None and root is not None:
+            return sum(e["size"] for e in self.file_index.verify(root, manifest["files"]))
+        have = {(e["path"], e["sha256"]) for e in old["files"]} if old else set()
+        return sum(e["size"] for e in manifest["files"] if (e["path"], e["sha256"]) not in have)
+
+    def apply_step(self, step, root):
+        if step["kind"] == "packs":
+            self.extract_packs(step["assets"], root)
+        elif step["kind"] == "delta":
+            self.progress.add_work(1, step["size"])
+            PackExtractor(self.downloader).extract(step["url"], root)
+            for relative_path in step["removed"]:
+                self.manifest_path(root, relative_path).unlink(missing_ok=True)
+
+    @staticmethod
+    def build_delta(old_root, new_root, source, target, output, url):
+        """Writes a tar of the files that changed between two modpack trees and returns its deltas.json entry"""
+        old_manifest = UpdateManager.build_manifest(old_root, source)
+        new_manifest = UpdateManager.build_manifest(new_root, target)
+        old_files = {e["path"]: e["sha256"] for e in old_manifest["files"]}
+        new_paths = {e["path"] for e in new_manifest["files"]}
+        with tarfile.open(output, "w:xz") as tar:
+            for entry in new_manifest["files"]:
+                if old_files.get(entry["path"]) != entry["sha256"]:
+                    tar.add(Path(new_root) / entry["path"], arcname=entry["path"])
+        return {"from": source, "to": target, "url": url, "size": os.path.getsize(output),
+                "removed": sorted(set(old_files) - new_paths)}
+
+    def is_major_jump(self, tag):
+        def major(version):
+            digits = "".join(itertools.takewhile(str.isdigit, version.lstrip("vV")))
+            return int(digits) if digits else None
+        current = major(self.current_version["modpack"])
+        return current is not None and current != major(tag)
+
+    LINKED_DIRS = ("mods", "libraries", "versions", "assets", "resourcepacks", "shaderpacks")
+
+    def link_tree(self, source, target):
+        """Mirrors source into target, hardlinking the directories whose files are only ever replaced whole.
+
+        Everything else, such as config/ and options.txt, is copied: the game rewrites those files in
+        place, which through a shared inode would also change the snapshot kept for rollback.
+        """
+        for file_path in source.rglob("*"):
+            if not file_path.is_file() or file_path.name.endswith(".part"):
+                continue
+            relative = file_path.relative_to(source)
+            target_path = target / relative
+            if target_path.exists():
+                continue
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            if relative.parts[0] in self.LINKED_DIRS:
+                try:
+                    os.link(file_path, target_path)
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(file_path, target_path)
+
+    def activate_staged_modpack(self):
+        """Swaps a ready staging directory in, keeping the old modpack as a snapshot.
+
+        Returns False, discarding the stage, if it holds the version that is already installed:
+        swapping that in would replace the only rollback snapshot with a copy of itself.
+        """
+        live, staging, marker, snapshots = self.staging_paths()
+        state = self.load_stage_state()
+        if not state.get("ready") or not staging.is_dir():
+            raise RuntimeError("No verified modpack update is staged")
+
+        previous = self.current_version["modpack"]
+        if state["tag"] == previous:
+            shutil.rmtree(staging)
+            marker.unlink(missing_ok=True)
+            return False
+        # The old snapshot is only dropped once the new one is in place
+        incoming = snapshots / f".{previous}.incoming"
+        if live.exists():
+            snapshots.mkdir(parents=True, exist_ok=True)
+            if incoming.exists():
+                shutil.rmtree(incoming)
+            os.replace(live, incoming)
+        os.replace(staging, live)
+
+        self.current_version["previous_modpack"] = previous
+        self.current_version["modpack"] = state["tag"]
+        self.save_version()
+        marker.unlink(missing_ok=True)
+        if incoming.exists():
+            for old in snapshots.iterdir():
+                if old != incoming:
+                    shutil.rmtree(old)
+            os.replace(incoming, snapshots / previous)
+
+        # Every staged file was verified against the release, so the index can trust it as-is
+        manifest = self.load_release_manifest(state["tag"])
+        if manifest:
+            self.file_index.record_verified(live, manifest["files"])
+        return True
+
+    def recover_modpack(self):
+        """Finishes a swap that was interrupted after the live modpack was moved away"""
+        live, staging, _, _ = self.staging_paths()
+        try:
+            if not live.exists() and staging.is_dir() and self.load_stage_state().get("ready"):
+                self.activate_staged_modpack()
+        except Exception as e:
+            print(f"Modpack recovery failed: {e}")
+
+    def rollback_modpack(self):
+        """Swaps the last good modpack snapshot back in, discarding any staged update"""
+        with self.update_lock:
+            live, staging, marker, snapshots = self.staging_paths()
+            previous = self.current_version.get("previous_modpack")
+            snapshot = snapshots / previous if previous else None
+            if snapshot is None or not snapshot.is_dir():
+                raise RuntimeError("No previous modpack version to roll back to")
+
+            current = self.current_version["modpack"]
+            os.replace(live, snapshots / current)
+            os.replace(snapshot, live)
+            if staging.exists():
+                shutil.rmtree(staging)
+            marker.unlink(missing_ok=True)
+
+            self.current_version["previous_modpack"] = current
+            self.current_version["modpack"] = previous
+            self.save_version()
+            return previous
+
+    def verify_modpack(self, repair=True):
+        """Checks the live modpack against its release and re-downloads files that are missing or corrupt
+
+        Returns the relative paths that failed verification.
+        """
+        with self.update_lock:
+            tag = self.current_version["modpack"]
+            live = Path(self.MODPACK_DIR)
+            release = {"tag_name": tag}
+            entries = self.load_release_manifest(tag)
+            entries = entries["files"] if entries else None
+            if entries is None:
+                release = self.fetch_release(tag)
+                manifest = self.fetch_manifest(release)
+                if manifest is not None:
+                    self.save_release_manifest(tag, manifest)
+                    entries = manifest["files"]
+                else:
+                    prefix_len = len(self.MODPACK_DIR.rstrip("/")) + 1
+                    entries = [{"path": b["path"][prefix_len:], "size": b["size"], "git_sha": b["sha"]}
+                               for b in self.fetch_tree(release)]
+
+            self.progress.reset("Verifying modpack")
+            bad = self.file_index.verify(live, entries, self.progress)
+            if bad and repair:
+                self.progress.reset("Repairing modpack")
+                self.downloader.download_many(self.add_mirror_sources(
+                    [self.repair_job(release, entry, live) for entry in bad]))
+                self.file_index.record_verified(live, bad)
+            self.progress.finish(f"Modpack verified, {len(bad)} file(s) repaired" if repair
+                                 else f"Modpack verified, {len(bad)} file(s) damaged")
+            return [entry["path"] for entry in bad]
+
+    def repair_job(self, release, entry, root):
+        if "sha256" in entry:
+            return self.manifest_job(release, entry, root)
+        return {
+            "url": f"{self.raw_base_url}/{release['tag_name']}/{self.MODPACK_DIR}/{quote(entry['path'])}",
+            "path": self.manifest_path(root, entry["path"]),
+            "git_sha": entry["git_sha"],
+            "size": entry["size"],
+            "priority": self.file_priority(entry["path"])
+        }
+
+    def fetch_release(self, tag):
+        self.governor.acquire()
+        response = self.session.get(f"{self.update_base_url}/releases/tags/{quote(tag)}", headers=self.headers,
+                                    timeout=self.downloader.timeout)
         response.raise_for_status()
-        
-        for item in response.json():
-            if item["type"] == "file":
-                file_path = Path(item["path"])
-                download_url = item["download_url"]
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                file_response = requests.get(download_url)
-                with open(file_path, "wb") as f:
-                    f.write(file_response.content)
+        return response.json()
+
+    def fetch_tree(self, release):
+        """Returns every blob under MODPACK_DIR at the release tag using the git trees API"""
+        prefix = self.MODPACK_DIR.rstrip("/") + "/"
+        self.governor.acquire()
+        response = self.session.get(f"{self.update_base_url}/git/trees/{release['tag_name']}",
+                                    headers=self.headers, params={"recursive": "1"}, timeout=self.downloader.timeout)
+        response.raise_for_status()
+        tree = response.json()
+        if not tree.get("truncated"):
+            return [item for item in tree["tree"]
+                    if item["type"] == "blob" and item["path"].startswith(prefix)]
+
+        # Tree too large for one response: walk it one level at a time, only along MODPACK_DIR
+        blobs = []
+        pending = [("", tree["sha"])]
+        while pending:
+            base, sha = pending.pop()
+            self.governor.acquire()
+            response = self.session.get(f"{self.update_base_url}/git/trees/{sha}", headers=self.headers,
+                                        timeout=self.downloader.timeout)
+            response.raise_for_status()
+            for item in response.json()["tree"]:
+                path = base + item["path"]
+                if item["type"] == "tree" and (prefix.startswith(path + "/") or path.startswith(prefix)):
+                    pending.append((path + "/", item["sha"]))
+                elif item["type"] == "blob" and path.startswith(prefix):
+                    blobs.append(dict(item, path=path))
+        return blobs
+
+    def diff_tree(self, blobs, root, release):
+        """Returns download jobs for the blobs whose local git blob SHA differs"""
+        prefix_len = len(self.MODPACK_DIR.rstrip("/")) + 1
+        jobs = []
+        for item in blobs:
+            file_path = self.manifest_path(root, item["path"][prefix_len:])
+            try:
+                if file_path.stat().st_size == item["size"] and self.git_blob_sha(file_path) == item["sha"]:
+                    continue
+            except OSError:
+                pass
+            jobs.append({
+                "url": f"{self.raw_base_url}/{release['tag_name']}/{quote(item['path'])}",
+                "path": file_path,
+                "git_sha": item["sha"],
+                "size": item["size"],
+                "priority": self.file_priority(item["path"][prefix_len:])
+            })
+        return jobs
+
+    def fetch_manifest(self, release):
+        """Returns the release manifest, or None if the release has none"""
+        return self.fetch_release_json(release, self.MANIFEST_ASSET)
+
+    def fetch_release_json(self, release, name):
+        asset = next((a for a in release.get("assets", []) if a["name"] == name), None)
+        if asset is None:
+            return None
+        response = self.session.get(asset["browser_download_url"], timeout=self.downloader.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def diff_manifest(self, manifest, root):
+        """Returns the manifest entries that are missing or different on disk"""
+        changed = []
+        for entry in manifest["files"]:
+            file_path = self.manifest_path(root, entry["path"])
+            try:
+                if file_path.stat().st_size == entry["size"] and self.hash_file(file_path) == entry["sha256"]:
+                    continue
+            except OSError:
+                pass
+            changed.append(entry)
+        return changed
+
+    @staticmethod
+    def manifest_path(root, relative_path):
+        parts = Path(relative_path).parts
+        if not parts or Path(relative_path).is_absolute() or ".." in parts:
+            raise ValueError(f"Unsafe path in manifest: {relative_path}")
+        return root.joinpath(*parts)
+
+    def manifest_job(self, release, entry, root):
+        url = entry.get("url") or f"{self.raw_base_url}/{release['tag_name']}/{self.MODPACK_DIR}/{quote(entry['path'])}"
+        return {"url": url, "path": self.manifest_path(root, entry["path"]), "sha256": entry["sha256"],
+                "size": entry["size"], "sources": [f"{peer}/files/{entry['sha256']}" for peer in self.peers],
+                "priority": self.file_priority(entry["path"])}
+
+    def add_mirror_sources(self, jobs):
+        """Ranks the configured mirrors on a sample file and offers them, fastest first, for every job"""
+        mirrors = getattr(self.app, "config", {}).get("update_mirrors", [])
+        primary = [job for job in jobs if self.mirrors.base_of(job["url"]) == self.mirrors.primary]
+        if not mirrors or not primary:
+            return jobs
+        self.mirrors.set_mirrors(mirrors)
+        sample = max(primary, key=lambda job: job.get("size") or 0)
+        print(f"Mirror ranking: {self.mirrors.probe(self.session, sample['url'][len(self.mirrors.primary) + 1:])}")
+        for job in jobs:
+            job["sources"] = list(job.get("sources", [])) + self.mirrors.alternatives(job["url"])
+        return jobs
+
+    def file_priority(self, relative_path):
+        """Launch-critical classpath files first, then mods, then everything else"""
+        top = relative_path.split("/", 1)[0]
+        if top in ("libraries", "versions"):
+            return DownloadEngine.PRIORITY_CRITICAL
+        if top == "mods":
+            return DownloadEngine.PRIORITY_MODS
+        return DownloadEngine.PRIORITY_OPTIONAL
+
+    def release_manifest_path(self, tag):
+        return MinecraftLauncher.APP_DATA_DIR / "manifests" / f"{tag}.json"
+
+    def save_release_manifest(self, tag, manifest):
+        path = self.release_manifest_path(tag)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+
+    def load_release_manifest(self, tag):
+        try:
+            with open(self.release_manifest_path(tag), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def start_peer_server(self, port=0):
+        if self.peer_server is None:
+            self.peer_server = PeerServer(self, port)
+            self.peer_server.start()
+        return self.peer_server
+
+    def stop_peer_server(self):
+        if self.peer_server is not None:
+            self.peer_server.stop()
+            self.peer_server = None
+
+    def background_rate(self):
+        """Bandwidth cap for background prefetch in bytes per second, or None"""
+        limit = getattr(self.app, "config", {}).get("background_bandwidth_kbps", 2048)
+        return limit * 1024 if limit else None
+
+    def find_peers(self):
+        """Returns reachable LAN peers: discovered ones plus those listed in the config"""
+        config = getattr(self.app, "config", {})
+        if not config.get("lan_peer_discovery", True):
+            return []
+        exclude = self.peer_server.instance_id if self.peer_server else None
+        candidates = PeerServer.discover(exclude=exclude) + [f"http://{p}" for p in config.get("lan_peers", [])]
+        peers = []
+        for peer in dict.fromkeys(candidates):
+            try:
+                self.session.get(f"{peer}/ping", timeout=1).raise_for_status()
+                peers.append(peer)
+            except requests.RequestException:
+                pass
+        return peers
+
+    @staticmethod
+    def hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def git_blob_sha(path):
+        """SHA-1 of the file as git stores it, comparable to tree entry SHAs"""
+        digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def build_manifest(root, version):
+        """Builds the manifest published alongside a modpack release"""
+        root = Path(root)
+        files = []
+        for file_path in sorted(p for p in root.rglob("*") if p.is_file()):
+            files.append({
+                "path": file_path.relative_to(root).as_posix(),
+                "size": file_path.stat().st_size,
+                "sha256": UpdateManager.hash_file(file_path)
+            })
+        return {"version": version, "files": files}
 
     def update_launcher(self, release):
+        self.install_launcher(self.stage_launcher(release))
+
+    def stage_launcher(self, release):
+        """Downloads the new launcher next to the running one and returns its path.
+
+        A launcher already staged for the same release is reused; the update lock keeps the
+        background scheduler and an explicit update from writing the file at the same time.
+        """
         launcher_asset = next(a for a in release["assets"] if a["name"] == self.LAUNCHER_EXE)
         temp_path = Path.home() / "AppData" / "Local" / "Temp" / self.LAUNCHER_EXE
         
-        with requests.get(launcher_asset["browser_download_url"], stream=True) as r:
-            with open(temp_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        
+        digest = launcher_asset.get("digest") or ""
+        sha256 = digest[len("sha256:"):] if digest.startswith("sha256:") else None
+        with self.update_lock:
+            if self.staged_launcher == release["tag_name"] and temp_path.exists():
+                return temp_path
+            self.progress.reset("Downloading launcher")
+            if not self.patch_launcher(release, temp_path, sha256):
+                self.progress.add_work(1, launcher_asset.get("size", 0))
+                self.downloader.download(launcher_asset["browser_download_url"], temp_path, sha256=sha256)
+            self.staged_launcher = release["tag_name"]
+            self.progress.finish("Launcher update ready")
+        return temp_path
+
+    def install_launcher(self, temp_path):
         script = f"""@echo off
         timeout /t 2 /nobreak >nul
         del "{sys.executable}"
@@ -112,11 +2013,1017 @@ class UpdateManager:
             f.write(script)
             
         subprocess.Popen(["start", "cmd", "/c", str(script_path)], shell=True)
-        self.app.quit()
+        if self.app:
+            self.app.quit()
+
+    def patch_launcher(self, release, temp_path, sha256=None):
+        """Builds the new launcher from a delta against the running one, if the release has one"""
+        patch_name = f"{self.LAUNCHER_EXE}.{self.current_version['launcher']}.patch"
+        patch_asset = next((a for a in release["assets"] if a["name"] == patch_name), None)
+        if patch_asset is None:
+            return False
+        patch_path = temp_path.with_name(patch_name)
+        try:
+            self.downloader.download(patch_asset["browser_download_url"], patch_path)
+            with open(sys.executable, "rb") as f:
+                source = f.read()
+            target = BinaryPatch.apply(source, patch_path.read_bytes())
+            if sha256 and hashlib.sha256(target).hexdigest() != sha256:
+                raise ValueError("Patched launcher does not match the release asset")
+            with open(temp_path, "wb") as f:
+                f.write(target)
+            return True
+        except Exception as e:
+            print(f"Launcher patch failed, downloading full update: {e}")
+            return False
+        finally:
+            patch_path.unlink(missing_ok=True)
+
+class UpdateScheduler:
+    """Checks for and stages updates in the background so Launch never waits on the network"""
+
+    def __init__(self, update_manager, interval=1800):
+        self.update_manager = update_manager
+        self.interval = interval
+        self.state = "idle"
+        self.updates = None
+        self.release = None
+        self.launcher_path = None
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.run_once()
+            # Checking again before GitHub's limit resets would only be refused
+            time.sleep(max(self.interval, self.update_manager.governor.seconds_blocked()))
+
+    def run_once(self):
+        self.state = "checking"
+        updates, release = self.update_manager.check_updates()
+        if updates is None:
+            self.state = "failed"
+            return
+        # A launcher staged for an older release must not be offered for this one
+        if self.release is None or release["tag_name"] != self.release["tag_name"]:
+            self.launcher_path = None
+        self.updates, self.release = updates, release
+        if not any(updates.values()):
+            self.state = "up_to_date"
+            return
+
+        self.state = "staging"
+        self.update_manager.cap_background(True)
+        try:
+            if updates["modpack"]:
+                with self.update_manager.update_lock:
+                    self.update_manager.stage_modpack(release)
+            if updates["launcher"] and self.launcher_path is None:
+                self.launcher_path = self.update_manager.stage_launcher(release)
+            self.state = "ready"
+        except Exception as e:
+            print(f"Background update failed: {e}")
+            self.state = "failed"
+        finally:
+            self.update_manager.cap_background(False)
+
+    def apply_staged_modpack(self):
+        """Swaps in a fully staged modpack, if there is one; never touches the network"""
+        manager = self.update_manager
+        if not manager.update_lock.acquire(blocking=False):
+            return False
+        try:
+            if not manager.load_stage_state().get("ready"):
+                return False
+            if not manager.activate_staged_modpack():
+                return False
+            if self.updates:
+                self.updates["modpack"] = False
+            return True
+        finally:
+            manager.update_lock.release()
+
+class ClasspathResolver:
+    """Builds the launch classpath from the version JSONs, as the vanilla launcher reads them.
+
+    A version inherits libraries from the JSON named by inheritsFrom; when both list the
+    same Maven coordinate, the child's entry wins. Results are cached per version JSON
+    content, modpack version and platform. Natives jars are returned separately, for
+    NativesStage to unpack, instead of being left on the classpath.
+    """
+    FORMAT = 2
+
+    def __init__(self, game_dir, version_id, cache_path):
+        self.game_dir = Path(game_dir)
+        self.version_id = version_id
+        self.cache_path = Path(cache_path)
+
+    @staticmethod
+    def current_platform():
+        """Returns (os name, arch) in the terms version JSON rules use"""
+        os_name = {"win32": "windows", "darwin": "osx"}.get(sys.platform, "linux")
+        machine = platform.machine().lower()
+        if machine in ("arm64", "aarch64"):
+            return os_name, "arm64"
+        if machine in ("x86", "i386", "i686"):
+            return os_name, "x86"
+        return os_name, "x86_64"
+
+    @staticmethod
+    def rules_allow(rules, os_name, arch):
+        """Evaluates a rules list; the last matching rule decides and no rules means allowed"""
+        if not rules:
+            return True
+        allowed = False
+        for rule in rules:
+            # Launcher features (demo mode, custom resolution, ...) are never switched on here
+            if rule.get("features"):
+                continue
+            os_rule = rule.get("os", {})
+            if os_rule.get("name", os_name) != os_name:
+                continue
+            if "arch" in os_rule and os_rule["arch"] != arch:
+                continue
+            allowed = rule["action"] == "allow"
+        return allowed
+
+    @staticmethod
+    def native_matches(classifier, os_name, arch):
+        """Natives classifiers name their platform, e.g. natives-windows-arm64; plain jars always match"""
+        if not classifier.startswith("natives-"):
+            return True
+        parts = classifier[len("natives-"):].split("-", 1)
+        native_os = {"macos": "osx"}.get(parts[0], parts[0])
+        native_arch = {"aarch_64": "arm64", "x86_64": "x86_64"}.get(parts[1], parts[1]) if len(parts) > 1 else "x86_64"
+        return native_os == os_name and native_arch == arch
+
+    @staticmethod
+    def library_path(library):
+        artifact = library.get("downloads", {}).get("artifact")
+        if artifact and artifact.get("path"):
+            return artifact["path"]
+        group, name, version, *rest = library["name"].split("@")[0].split(":")
+        classifier = f"-{rest[0]}" if rest else ""
+        return f"{group.replace('.', '/')}/{name}/{version}/{name}-{version}{classifier}.jar"
+
+    def version_json_path(self, version_id):
+        version_dir = self.game_dir / "versions" / version_id
+        path = version_dir / f"{version_id}.json"
+        if not path.exists():
+            path = next(iter(sorted(version_dir.glob("*.json"))), path)
+        return path
+
+    def load_chain(self):
+        """Returns [(version id, parsed JSON, raw bytes)] from the launched version up to its root"""
+        chain = []
+        version_id = self.version_id
+        while version_id:
+            if any(v == version_id for v, _, _ in chain):
+                raise ValueError(f"Version {version_id} inherits from itself")
+            raw = self.version_json_path(version_id).read_bytes()
+            data = json.loads(raw)
+            chain.append((version_id, data, raw))
+            version_id = data.get("inheritsFrom")
+        return chain
+
+    def resolve(self, modpack_version):
+        """Returns the classpath and launch metadata for the version, from the cache when it is current"""
+        chain = self.load_chain()
+        os_name, arch = self.current_platform()
+        key = hashlib.sha256()
+        for _, _, raw in chain:
+            key.update(raw)
+        key.update(f"\0{modpack_version}\0{os_name}\0{arch}\0{self.FORMAT}".encode())
+        key = key.hexdigest()
+
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                return cached["launch"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        libraries = []
+        natives = []
+        seen = set()
+        for _, data, _ in chain:
+            for library in data.get("libraries", []):
+                if not self.rules_allow(library.get("rules"), os_name, arch):
+                    continue
+                group, name, _version, *rest = library["name"].split("@")[0].split(":")
+                classifier = rest[0] if rest else ""
+                if not self.native_matches(classifier, os_name, arch) or (group, name, classifier) in seen:
+                    continue
+                seen.add((group, name, classifier))
+                path = self.game_dir / "libraries" / self.library_path(library)
+                (natives if classifier.startswith("natives-") else libraries).append(path)
+
+        jars = [self.game_dir / "versions" / v / f"{v}.jar" for v, _, _ in chain]
+        client_jar = next((jar for jar in jars if jar.exists()), jars[-1])
+        missing = [str(p) for p in libraries + natives + [client_jar] if not p.exists()]
+        for path in missing:
+            print(f"Library not found, leaving it off the classpath: {path}")
+
+        launch = {
+            "version": self.version_id,
+            "sources": [str(self.version_json_path(v)) for v, _, _ in chain],
+            "classpath": os.pathsep.join(str(p) for p in libraries + [client_jar] if p.exists()),
+            "natives": [str(p) for p in natives if p.exists()],
+            "missing": missing,
+            "main_class": next(d["mainClass"] for _, d, _ in chain if "mainClass" in d),
+            "asset_index": next((d["assetIndex"]["id"] for _, d, _ in chain if "assetIndex" in d), chain[-1][0])
+        }
+        # An install with gaps is usually mid-repair; resolve it again next time
+        if not missing:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, "w") as f:
+                json.dump({"key": key, "launch": launch}, f)
+        return launch
+
+class NativesStage:
+    """Unpacks the platform's natives jars into one directory, only when the jars change.
+
+    LWJGL otherwise pulls its libraries out of the classpath jars into a temp directory on
+    every start. The directory is rebuilt beside the live one and swapped in whole.
+    """
+    KEY_FILE = ".natives-key"
+    SKIPPED = (".sha1", ".git", ".list", ".MF")
+
+    @staticmethod
+    def content_key(jars):
+        digest = hashlib.sha256()
+        for jar in sorted(jars):
+            digest.update(f"{os.path.basename(jar)}\0{UpdateManager.hash_file(jar)}\0".encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def prepare(cls, jars, target_dir):
+        """Makes target_dir hold exactly the libraries from jars; returns True if it was rebuilt"""
+        target_dir = Path(target_dir)
+        key = cls.content_key(jars)
+        try:
+            if (target_dir / cls.KEY_FILE).read_text() == key:
+                return False
+        except OSError:
+            pass
+
+        temp_dir = target_dir.with_name(target_dir.name + ".tmp")
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+        temp_dir.mkdir(parents=True)
+
+        def extract(jar):
+            with zipfile.ZipFile(jar) as archive:
+                for info in archive.infolist():
+                    name = info.filename.rsplit("/", 1)[-1]
+                    if info.is_dir() or info.filename.startswith("META-INF/") or name.endswith(cls.SKIPPED):
+                        continue
+                    # LWJGL looks libraries up by file name, so the jars' os/arch folders are flattened
+                    with archive.open(info) as source, open(temp_dir / name, "wb") as target:
+                        shutil.copyfileobj(source, target)
+
+        with ThreadPoolExecutor(max_workers=min(len(jars), 8) or 1) as pool:
+            for future in as_completed([pool.submit(extract, jar) for jar in jars]):
+                future.result()
+        (temp_dir / cls.KEY_FILE).write_text(key)
+
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+        os.replace(temp_dir, target_dir)
+        return True
+
+class JvmTuner:
+    """Picks heap size, garbage collector and pre-touch from the machine and the Java runtime"""
+    SYSTEM_RESERVE_MB = 3072
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = {}
+
+    @staticmethod
+    def physical_memory_mb():
+        try:
+            if sys.platform == "win32":
+                class MemoryStatus(ctypes.Structure):
+                    _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                                ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                                ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                                ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                                ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+                status = MemoryStatus()
+                status.dwLength = ctypes.sizeof(MemoryStatus)
+                ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+                return status.ullTotalPhys // (1024 * 1024)
+            if sys.platform == "darwin":
+                return int(subprocess.check_output(["sysctl", "-n", "hw.memsize"])) // (1024 * 1024)
+            return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+        except (OSError, ValueError, AttributeError, subprocess.SubprocessError):
+            return None
+
+    def java_version(self, java_path):
+        """Major version of the runtime at java_path, or None; remembered per executable"""
+        try:
+            key = (java_path, os.stat(java_path).st_mtime_ns)
+        except OSError:
+            return None
+        with self.lock:
+            if key in self.versions:
+                return self.versions[key]
+        # javaw has no console of its own; its java sibling reports the same version
+        console = os.path.join(os.path.dirname(java_path), "java.exe")
+        executable = console if java_path.endswith("javaw.exe") and os.path.exists(console) else java_path
+        try:
+            result = subprocess.run([executable, "-version"], capture_output=True, text=True, timeout=15,
+                                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+            match = re.search(r'version "(\d+)(?:\.(\d+))?', result.stderr + result.stdout)
+            version = (int(match.group(2) or 0) if match.group(1) == "1" else int(match.group(1))) if match else None
+        except (OSError, subprocess.SubprocessError):
+            version = None
+        with self.lock:
+            self.versions[key] = version
+        return version
+
+    @classmethod
+    def tune(cls, ram, total_mb, cores, java_major):
+        """Returns (JVM arguments, reasons) for a requested heap of ram MB on the given machine"""
+        reasons = []
+        heap = ram
+        if total_mb:
+            cap = max(1024, total_mb - max(cls.SYSTEM_RESERVE_MB, total_mb // 4))
+            if heap > cap:
+                heap = cap
+                reasons.append(f"Heap capped at {heap} MB (asked for {ram} MB): this PC has {total_mb / 1024:.1f} GB "
+                               f"and the system plus the game's native memory need the rest.")
+            else:
+                reasons.append(f"Heap {heap} MB of {total_mb / 1024:.1f} GB RAM.")
+        else:
+            reasons.append(f"Heap {heap} MB; the amount of RAM could not be read.")
+
+        # Pre-touching costs startup time per GB and must never push the machine into swap
+        pretouch = bool(total_mb) and heap <= 8192 and total_mb - heap >= max(4096, total_mb // 2)
+        if pretouch:
+            reasons.append("Heap pre-touched at startup: plenty of free RAM, so no page faults while playing.")
+        else:
+            reasons.append("No pre-touch: the heap grows on demand instead of faulting in all at startup.")
+        args = [f"-Xms{heap if pretouch else min(heap, 2048)}M", f"-Xmx{heap}M"]
+        if pretouch:
+            args.append("-XX:+AlwaysPreTouch")
+
+        java_label = f"Java {java_major}" if java_major else "Java version unknown"
+        if java_major and java_major >= 21 and (cores or 0) >= 8 and heap >= 8192:
+            reasons.append(f"Generational ZGC: {java_label}, {cores} threads and a large heap keep pauses "
+                           f"under a millisecond.")
+            # Generational mode is the default from Java 23, where the switch is being retired
+            generational = ["-XX:+ZGenerational"] if java_major < 23 else []
+            return args + ["-XX:+UseZGC"] + generational + ["-XX:+DisableExplicitGC"], reasons
+
+        missing = [why for ok, why in ((java_major and java_major >= 21, java_label),
+                                       ((cores or 0) >= 8, f"{cores} threads"),
+                                       (heap >= 8192, "heap under 8 GB")) if not ok]
+        reasons.append(f"G1 collector (ZGC needs Java 21+, 8+ threads and an 8 GB heap; here: {', '.join(missing)}).")
+        large = heap >= 12288
+        return args + [
+            "-XX:+UnlockExperimentalVMOptions",
+            "-XX:+DisableExplicitGC",
+            "-XX:MaxGCPauseMillis=200",
+            "-XX:+ParallelRefProcEnabled",
+            "-XX:+UseG1GC",
+            f"-XX:G1NewSizePercent={40 if large else 30}",
+            f"-XX:G1MaxNewSizePercent={50 if large else 40}",
+            f"-XX:G1HeapRegionSize={16 if large else 8}M",
+            f"-XX:G1ReservePercent={15 if large else 20}",
+            f"-XX:InitiatingHeapOccupancyPercent={20 if large else 15}",
+            "-XX:G1HeapWastePercent=5",
+            "-XX:G1MixedGCCountTarget=4",
+            "-XX:G1MixedGCLiveThresholdPercent=90",
+            "-XX:G1RSetUpdatingPauseTimePercent=5",
+            "-XX:+UseStringDeduplication"
+        ], reasons
+
+    def hardware(self):
+        return [self.physical_memory_mb(), os.cpu_count()]
+
+    def describe(self, ram, java_path):
+        total_mb, cores = self.hardware()
+        return self.tune(ram, total_mb, cores, self.java_version(java_path))[1]
+
+class ClassDataSharing:
+    """AppCDS archives of the classes the game loads, trained on one launch and reused after it.
+
+    The first launch for a key records its class list; the next one dumps the archive in
+    the background, and every launch after that maps it. Keys cover the java runtime, the
+    exact classpath with its jars' stats and the modpack version, so any change starts over.
+    A dump that fails is retried on later launches with a growing delay, then given up on.
+    """
+    MIN_JAVA = 11
+    MAX_DUMPS = 3
+    RETRY_DELAY = 3600
+    STALE_LOCK = 1800
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def key(java_path, java_major, classpath, stamps, modpack_version):
+        digest = hashlib.sha256(f"{java_path}\0{java_major}\0{classpath}\0{modpack_version}".encode())
+        for path in [java_path] + classpath.split(os.pathsep):
+            digest.update(f"\0{path}\0{stamps.get(path)}".encode())
+        return digest.hexdigest()[:32]
+
+    def paths(self, key):
+        return self.directory / f"{key}.classlist", self.directory / f"{key}.jsa"
+
+    def load_dumps(self, key):
+        try:
+            with open(self.directory / f"{key}.dumps.json", "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"attempts": 0, "failures": 0, "last": 0}
+
+    def save_dumps(self, key, dumps):
+        with open(self.directory / f"{key}.dumps.json", "w") as f:
+            json.dump(dumps, f)
+
+    def may_dump(self, key):
+        """False once the dumps for this key keep failing, and while the last failure is recent"""
+        dumps = self.load_dumps(key)
+        if dumps["failures"] >= self.MAX_DUMPS:
+            return False
+        return not dumps["failures"] or time.time() - dumps["last"] >= self.RETRY_DELAY * 2 ** (dumps["failures"] - 1)
+
+    def launch_args(self, profile):
+        """JVM arguments for this launch: use the archive, record a class list, or nothing"""
+        key = profile.get("cds_key")
+        if not key:
+            return []
+        classlist, archive = self.paths(key)
+        if archive.exists() and archive.stat().st_size:
+            # -Xshare:auto falls back to normal class loading if the JVM rejects the archive
+            return [f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prune(key)
+        if classlist.exists() and classlist.stat().st_size:
+            if self.may_dump(key):
+                self.build_archive(profile, key)
+            return []
+        return [f"-XX:DumpLoadedClassList={classlist}"]
+
+    def build_archive(self, profile, key):
+        """Starts the archive dump unless another launch is already running one for this key.
+
+        The dump runs on a non-daemon thread, so the interpreter waits for it even if the launcher
+        closes first. It writes to a temp file that only replaces the archive once the JVM succeeds.
+        """
+        lock = self.directory / f"{key}.lock"
+        try:
+            if time.time() - lock.stat().st_mtime >= self.STALE_LOCK:
+                lock.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return
+        dumps = self.load_dumps(key)
+        dumps["attempts"] += 1
+        dumps["last"] = time.time()
+        self.save_dumps(key, dumps)
+        threading.Thread(target=self.dump_archive, args=(profile, key, lock)).start()
+
+    def dump_archive(self, profile, key, lock):
+        classlist, archive = self.paths(key)
+        temp_path = archive.with_name(archive.name + ".tmp")
+        command = profile["command"]
+        java_path = command[0]
+        classpath = command[command.index("-cp") + 1]
+        try:
+            result = subprocess.run([java_path, "-Xshare:dump", f"-XX:SharedClassListFile={classlist}",
+                                     f"-XX:SharedArchiveFile={temp_path}", "-cp", classpath],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+            if result.returncode or not temp_path.exists() or not temp_path.stat().st_size:
+                raise RuntimeError(f"java exited with code {result.returncode}")
+            os.replace(temp_path, archive)
+            (self.directory / f"{key}.dumps.json").unlink(missing_ok=True)
+        except (OSError, RuntimeError) as e:
+            print(f"Building the class data archive failed: {e}")
+            temp_path.unlink(missing_ok=True)
+            dumps = self.load_dumps(key)
+            dumps["failures"] += 1
+            self.save_dumps(key, dumps)
+        finally:
+            lock.unlink(missing_ok=True)
+
+    def prune(self, key):
+        """Removes class lists, archives and dump records left over from other keys"""
+        for path in self.directory.glob("*"):
+            if path.name.split(".", 1)[0] != key:
+                path.unlink(missing_ok=True)
+
+class LaunchProfiles:
+    """Launch commands compiled once per modpack version, server and RAM setting.
+
+    A profile records the size and mtime of every file its command depends on, so checking
+    it is a handful of stat calls; the player name is filled in when the game starts.
+    """
+    USERNAME = "${auth_player_name}"
+
+    def __init__(self, path, resolver, tuner=None):
+        self.path = Path(path)
+        self.resolver = resolver
+        self.tuner = tuner or JvmTuner()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(modpack_version, server, ram):
+        return f"{modpack_version}|{server}|{ram}"
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, modpack_version, server, ram):
+        """Returns a valid profile, compiling and storing a new one if needed"""
+        key = self.key(modpack_version, server, ram)
+        with self.lock:
+            profile = self.load().get(key)
+            if profile and self.is_valid(profile):
+                return profile
+            profile = self.build(modpack_version, server, ram)
+            # Profiles for other modpack versions can never be valid again
+            profiles = {k: p for k, p in self.load().items() if k.startswith(f"{modpack_version}|")}
+            profiles[key] = profile
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(profiles, f, indent=2)
+            return profile
+
+    @staticmethod
+    def stamp(path):
+        """[size, mtime] of the file, or None while it does not exist"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def is_valid(self, profile):
+        if profile.get("hardware") != self.tuner.hardware():
+            return False
+        try:
+            return all(self.stamp(path) == stamp for path, stamp in profile["stamps"].items())
+        except OSError:
+            return False
+
+    def build(self, modpack_version, server, ram):
+        java_path = self.find_java()
+        minecraft_dir = str(self.resolver.game_dir)
+        natives_dir = os.path.join(minecraft_dir, "versions", self.resolver.version_id, "natives")
+        launch = self.resolver.resolve(modpack_version)
+        NativesStage.prepare(launch["natives"], natives_dir)
+        server_port = server.rsplit("(", 1)[-1].rstrip(")") if "(" in server else "25565"
+
+        total_mb, cores = hardware = self.tuner.hardware()
+        java_major = self.tuner.java_version(java_path)
+        tuning, _ = self.tuner.tune(ram, total_mb, cores, java_major)
+
+        java_args = tuning + [
+            "-Dfile.encoding=UTF-8",
+            f"-Djava.library.path={natives_dir}",
+            f"-Djna.tmpdir={natives_dir}",
+            f"-Dorg.lwjgl.librarypath={natives_dir}",
+            f"-Dorg.lwjgl.system.SharedLibraryExtractPath={natives_dir}",
+            f"-Dio.netty.native.workdir={natives_dir}",
+            "-Dminecraft.launcher.brand=java-minecraft-launcher",
+            "-Dminecraft.launcher.version=1.6.84-j",
+            "-cp", launch["classpath"],
+            launch["main_class"],
+            "--username", self.USERNAME,
+            "--version", launch["version"],
+            "--gameDir", minecraft_dir,
+            "--assetsDir", os.path.join(minecraft_dir, "assets"),
+            "--assetIndex", launch["asset_index"],
+            "--uuid", "501e8da5b1cd3df89970618b2b706e97",
+            "--accessToken", "[Minecraft is a lie]",
+            "--userType", "legacy",
+            "--versionType", "release",
+            "--width", "925",
+            "--height", "530",
+            "--server", "localhost",
+            "--port", server_port
+        ]
+
+        # Files left off for being missing are stamped as absent, so restoring one rebuilds the profile
+        depends_on = [java_path, os.path.join(natives_dir, NativesStage.KEY_FILE)] + launch["sources"] + \
+            launch["classpath"].split(os.pathsep) + launch["natives"] + launch.get("missing", [])
+        stamps = {path: self.stamp(path) for path in depends_on}
+        cds_key = None
+        if java_major and java_major >= ClassDataSharing.MIN_JAVA:
+            cds_key = ClassDataSharing.key(java_path, java_major, launch["classpath"], stamps, modpack_version)
+        return {
+            "key": self.key(modpack_version, server, ram),
+            "command": [java_path] + java_args,
+            "hardware": hardware,
+            "cds_key": cds_key,
+            "stamps": stamps
+        }
+
+    @staticmethod
+    def find_java():
+        """The bundled Mojang runtime for this OS, or the system java where none is bundled"""
+        runtime, executable = {"win32": ("windows-x64", "javaw.exe"),
+                               "darwin": ("mac-os", "java")}.get(sys.platform, ("linux", "java"))
+        bundled = os.path.join("Minecraft", "jre", "java-runtime-gamma", runtime, "java-runtime-gamma", "bin", executable)
+        if os.path.exists(bundled):
+            return bundled
+        return shutil.which(executable) or bundled
+
+    @classmethod
+    def command(cls, profile, username, jvm_args=()):
+        command = [username if arg == cls.USERNAME else arg for arg in profile["command"]]
+        return command[:1] + list(jvm_args) + command[1:]
+
+    @classmethod
+    def start(cls, profile, username, capture=True, jvm_args=()):
+        return subprocess.Popen(
+            cls.command(profile, username, jvm_args),
+            stdout=subprocess.PIPE if capture else None,
+            stderr=subprocess.PIPE if capture else None,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        )
+
+class AhoCorasick:
+    """Multi-pattern byte matcher compiled to a full DFA, so scanning costs one table step per byte"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        goto = [{}]
+        outputs = [set()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                if byte not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].add(index)
+
+        # Breadth-first, so a state's failure state always has its row and outputs finished
+        table = [None] * len(goto)
+        fail = [0] * len(goto)
+        pending = collections.deque([0])
+        while pending:
+            state = pending.popleft()
+            row = table[state] = list(table[fail[state]]) if state else [0] * 256
+            for byte, child in goto[state].items():
+                fail[child] = table[fail[state]][byte] if state else 0
+                row[byte] = child
+                pending.append(child)
+            outputs[state] |= outputs[fail[state]]
+        self.table = table
+        self.outputs = [frozenset(o) for o in outputs]
+
+    def search(self, data):
+        """Returns the indexes of the patterns that occur in data"""
+        table, outputs = self.table, self.outputs
+        state = 0
+        found = set()
+        for byte in data:
+            state = table[state][byte]
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+class LogScanner:
+    """Recognises known failure signatures in game output, one line at a time.
+
+    All signatures go through a single Aho-Corasick pass per line, so scanning stays linear
+    in the size of the log. Each category is reported once, at its first occurrence, with
+    the lines around it.
+    """
+    SIGNATURES = {
+        "missing_dependency": ("A mod is missing a dependency or is incompatible", [
+            "incompatible mod set", "mod resolution failed", "which is missing", "requires any version of",
+            "requires version", "is incompatible with"]),
+        "java_version": ("The game needs a newer Java runtime", [
+            "unsupportedclassversionerror", "compiled by a more recent version of the java runtime"]),
+        "out_of_memory": ("The game ran out of memory", [
+            "java.lang.outofmemoryerror", "could not reserve enough space for", "insufficient memory for the java runtime",
+            "gc overhead limit exceeded"]),
+        "mixin": ("A mod failed to apply its mixins", [
+            "mixin apply failed", "mixinapplyerror", "mixin transformation of", "invalidmixinexception",
+            "critical injection failure", "mixintransformererror"]),
+        "gl_context": ("The graphics driver could not create an OpenGL context", [
+            "glfw error 65542", "glfw error 65543", "glfw error 65545", "does not appear to support opengl",
+            "failed to create window", "no opengl context", "couldn't set pixel format", "opengl 3.2 or above"]),
+        "crash_report": ("The game crashed", [
+            "---- minecraft crash report ----", "this crash report has been saved to", "exception in thread \"main\""])
+    }
+
+    def __init__(self, context_before=2, context_after=8):
+        self.context_after = context_after
+        self.categories = []
+        patterns = []
+        for category, (_, signature_patterns) in self.SIGNATURES.items():
+            for pattern in signature_patterns:
+                patterns.append(pattern.encode())
+                self.categories.append(category)
+        self.matcher = AhoCorasick(patterns)
+        self.recent = collections.deque(maxlen=context_before)
+        self.findings = {}
+        self.collecting = []
+        self.line_number = 0
+
+    def feed(self, line):
+        """Scans one line of output (bytes)"""
+        self.line_number += 1
+        if self.collecting:
+            for finding in self.collecting:
+                finding["excerpt"].append(line)
+            self.collecting = [f for f in self.collecting if len(f["excerpt"]) < f["limit"]]
+
+        for category in {self.categories[i] for i in self.matcher.search(line.lower())}:
+            if category not in self.findings:
+                finding = {
+                    "category": category,
+                    "title": self.SIGNATURES[category][0],
+                    "line": self.line_number,
+                    "excerpt": list(self.recent) + [line],
+                }
+                finding["limit"] = len(finding["excerpt"]) + self.context_after
+                self.findings[category] = finding
+                self.collecting.append(finding)
+        self.recent.append(line)
+
+    def report(self):
+        """Findings ordered from the most specific signature to the most generic one"""
+        order = list(self.SIGNATURES)
+        return [dict(category=f["category"], title=f["title"], line=f["line"],
+                     excerpt=[l.decode("utf-8", "replace").rstrip("\r\n") for l in f["excerpt"]])
+                for f in sorted(self.findings.values(), key=lambda f: order.index(f["category"]))]
+
+    @classmethod
+    def scan_file(cls, path):
+        scanner = cls()
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "rb") as f:
+            for line in f:
+                scanner.feed(line)
+        return scanner.report()
+
+    @staticmethod
+    def describe(findings):
+        return "\n\n".join(f"{f['title']} (line {f['line']}):\n" + "\n".join(f["excerpt"]) for f in findings)
+
+class GameLogPump:
+    """Drains the game's stdout and stderr into rotating gzip logs, keeping the latest output in memory.
+
+    A game whose pipes are not read stalls on its own log writes once the OS buffer fills,
+    so both pipes are read for as long as the process lives.
+    """
+
+    def __init__(self, process, directory, max_bytes=8 * 1024 * 1024, backups=10, ring_bytes=64 * 1024,
+                 timeline=None):
+        self.scanner = LogScanner()
+        self.timeline = timeline
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.ring_bytes = ring_bytes
+        self.lock = threading.Lock()
+        self.ring = collections.deque()
+        self.ring_size = 0
+        self.sequence = itertools.count()
+        self.log_path = self.directory / "latest.log"
+        self.rotate()
+        self.log = open(self.log_path, "ab")
+        self.last_flush = time.monotonic()
+        self.started = time.time()
+        self.threads = [threading.Thread(target=self.pump, args=(stream,), daemon=True)
+                        for stream in (process.stdout, process.stderr) if stream is not None]
+        for thread in self.threads:
+            thread.start()
+
+    def pump(self, stream):
+        with stream:
+            for line in iter(stream.readline, b""):
+                self.write(line)
+
+    def write(self, line):
+        with self.lock:
+            if self.timeline:
+                self.timeline.observe(line)
+            self.scanner.feed(line)
+            self.ring.append(line)
+            self.ring_size += len(line)
+            while self.ring_size > self.ring_bytes and len(self.ring) > 1:
+                self.ring_size -= len(self.ring.popleft())
+
+            self.log.write(line)
+            now = time.monotonic()
+            if now - self.last_flush >= 1.0:
+                self.log.flush()
+                self.last_flush = now
+            if self.log.tell() >= self.max_bytes:
+                self.log.close()
+                self.rotate()
+                self.log = open(self.log_path, "ab")
+
+    def rotate(self):
+        """Moves latest.log aside and compresses it off the pump threads"""
+        try:
+            if not self.log_path.stat().st_size:
+                return
+        except FileNotFoundError:
+            return
+        archived = self.directory / f"game-{time.strftime('%Y%m%d-%H%M%S')}-{next(self.sequence)}.log"
+        os.replace(self.log_path, archived)
+        threading.Thread(target=self.compress, args=(archived,)).start()
+
+    def compress(self, path):
+        try:
+            with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            path.unlink()
+            archives = sorted(self.directory.glob("game-*.log.gz"), key=lambda p: p.stat().st_mtime)
+            for old in archives[:-self.backups]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Compressing {path} failed: {e}")
+
+    def tail(self, max_lines=None):
+        with self.lock:
+            lines = list(self.ring)
+        if max_lines:
+            lines = lines[-max_lines:]
+        return b"".join(lines).decode("utf-8", "replace")
+
+    def join(self, timeout=None):
+        """Waits for both pipes to close, then flushes the log"""
+        for thread in self.threads:
+            thread.join(timeout)
+        with self.lock:
+            self.log.flush()
+            if not any(thread.is_alive() for thread in self.threads):
+                self.log.close()
+
+class LaunchMetrics:
+    """Stores the phase timings of recent launches so slow starts can be traced to a modpack version"""
+
+    PHASES = ("update_check", "profile", "spawn", "jvm_start", "mod_discovery", "game_init", "total")
+    HISTORY = 500
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS launches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                modpack TEXT,
+                outcome TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS spans (
+                launch_id INTEGER NOT NULL,
+                phase TEXT NOT NULL,
+                start REAL NOT NULL,
+                end REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS spans_launch ON spans (launch_id);
+        ''')
+        self.conn.commit()
+
+    def record(self, started_at, modpack, outcome, spans):
+        """Stores one launch's (phase, start, end) spans, in seconds from the launch, and drops old launches"""
+        with self.lock:
+            launch_id = self.conn.execute("INSERT INTO launches (started_at, modpack, outcome) VALUES (?, ?, ?)",
+                                          (started_at, modpack, outcome)).lastrowid
+            self.conn.executemany("INSERT INTO spans (launch_id, phase, start, end) VALUES (?, ?, ?, ?)",
+                                  [(launch_id, *span) for span in spans])
+            cutoff = launch_id - self.HISTORY
+            self.conn.execute("DELETE FROM spans WHERE launch_id <= ?", (cutoff,))
+            self.conn.execute("DELETE FROM launches WHERE id <= ?", (cutoff,))
+            self.conn.commit()
+        return launch_id
+
+    def summary(self, launches=50):
+        """Returns [(modpack, launch count, {phase: (samples, p50, p95)})] over the most recent launches,
+        newest modpack version first"""
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT l.id, l.modpack, s.phase, s.end - s.start FROM launches l
+                LEFT JOIN spans s ON s.launch_id = l.id
+                WHERE l.id IN (SELECT id FROM launches ORDER BY id DESC LIMIT ?)
+                ORDER BY l.id DESC
+            ''', (launches,)).fetchall()
+
+        groups = {}
+        for launch_id, modpack, phase, duration in rows:
+            ids, durations = groups.setdefault(modpack, (set(), {}))
+            ids.add(launch_id)
+            if phase is not None:
+                durations.setdefault(phase, []).append(duration)
+
+        order = {phase: i for i, phase in enumerate(self.PHASES)}
+        return [(modpack, len(ids), {phase: (len(values), self.percentile(values, 50), self.percentile(values, 95))
+                                     for phase, values in sorted(durations.items(),
+                                                                 key=lambda item: order.get(item[0], len(order)))})
+                for modpack, (ids, durations) in groups.items()]
+
+    @staticmethod
+    def percentile(values, p):
+        """Nearest-rank percentile, so the result is always a launch that actually happened"""
+        ordered = sorted(values)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    @staticmethod
+    def describe(summary):
+        if not summary:
+            return "No launches recorded yet"
+        lines = []
+        for modpack, count, phases in summary:
+            lines.append(f"Modpack {modpack or 'unknown'} ({count} launch{'es' if count != 1 else ''})")
+            lines.append(f"  {'phase':<15}{'n':>5}{'p50':>10}{'p95':>10}")
+            for phase, (samples, p50, p95) in phases.items():
+                lines.append(f"  {phase:<15}{samples:>5}{p50:>9.2f}s{p95:>9.2f}s")
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+class LaunchTimeline:
+    """Timestamps one launch, phase by phase, from the Launch button to the title screen.
+
+    Each phase starts where the previous one ended, so together they cover the whole launch.
+    The game's phases come from its output: the first line, Fabric's "Loading N mods", and
+    the sound engine starting, which is the last step before the title screen is drawn.
+    """
+    MODS_LOADING = re.compile(rb"Loading \d+ mods")
+    MAIN_MENU = b"Sound engine started"
+
+    def __init__(self, metrics, modpack=None):
+        self.metrics = metrics
+        self.modpack = modpack
+        self.started_at = time.time()
+        self.origin = time.monotonic()
+        self.last = 0.0
+        self.spans = []
+        self.lock = threading.Lock()
+        self.seen_output = False
+        self.seen_mods = False
+        self.done = False
+
+    def mark(self, phase):
+        """Ends the phase that is running now"""
+        with self.lock:
+            if self.done:
+                return
+            now = time.monotonic() - self.origin
+            self.spans.append((phase, self.last, now))
+            self.last = now
+
+    def observe(self, line):
+        """Picks the game's phases out of its output; lines must arrive one at a time"""
+        if self.done:
+            return
+        if not self.seen_output:
+            self.seen_output = True
+            self.mark("jvm_start")
+        if not self.seen_mods and self.MODS_LOADING.search(line):
+            self.seen_mods = True
+            self.mark("mod_discovery")
+        if self.MAIN_MENU in line:
+            self.mark("game_init")
+            self.finish("ok")
+
+    def finish(self, outcome):
+        """Stores the timeline once; a launch that never reached the title screen keeps only its finished phases"""
+        with self.lock:
+            if self.done:
+                return
+            self.done = True
+            spans = list(self.spans)
+            if outcome == "ok":
+                spans.append(("total", 0.0, self.last))
+        try:
+            self.metrics.record(self.started_at, self.modpack, outcome, spans)
+        except sqlite3.Error as e:
+            print(f"Recording launch timings failed: {e}")
 
 class MinecraftLauncher(ctk.CTk):
     APP_DATA_DIR = Path.home() / ".rbc_launcher"
     CONFIG_FILE = APP_DATA_DIR / "config.json"
+    UPDATE_CHECK_BUDGET = 3.0
 
     def __init__(self):
         super().__init__()
@@ -124,6 +3031,15 @@ class MinecraftLauncher(ctk.CTk):
         self.logged_in_username = None
         self.config = {}
         self.update_manager = UpdateManager(self)
+        self.update_scheduler = UpdateScheduler(self.update_manager)
+        self.update_events = self.update_manager.progress.subscribe()
+        self.classpath_resolver = ClasspathResolver(os.path.join("Minecraft", "game"), "Fabric 1.20.4",
+                                                    self.APP_DATA_DIR / "classpath.json")
+        self.launch_profiles = LaunchProfiles(self.APP_DATA_DIR / "profiles.json", self.classpath_resolver)
+        self.class_data_sharing = ClassDataSharing(self.APP_DATA_DIR / "cds")
+        self.launch_metrics = LaunchMetrics(self.APP_DATA_DIR / "metrics.db")
+        self.launch_timeline = None
+        self.offered_release = None
         
         self.setup_paths()
         self.load_config()
@@ -136,7 +3052,16 @@ class MinecraftLauncher(ctk.CTk):
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.setup_login_ui()
-        self.after(1000, self.check_updates)
+        self.update_scheduler.start()
+        self.poll_update_status()
+        if self.config["lan_peer_sharing"]:
+            self.start_peer_sharing()
+
+    def start_peer_sharing(self):
+        try:
+            self.update_manager.start_peer_server()
+        except OSError as e:
+            print(f"LAN sharing failed to start: {e}")
 
     def setup_paths(self):
         self.APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -156,7 +3081,9 @@ class MinecraftLauncher(ctk.CTk):
         self.conn.commit()
 
     def load_config(self):
-        self.config = {"remember_username": False, "last_username": "", "ram_allocation": 2048}
+        self.config = {"remember_username": False, "last_username": "", "ram_allocation": 2048,
+                       "lan_peer_sharing": False, "lan_peer_discovery": True, "lan_peers": [],
+                       "background_bandwidth_kbps": 2048, "update_mirrors": [], "class_data_sharing": True}
         try:
             if self.CONFIG_FILE.exists():
                 with open(self.CONFIG_FILE, "r") as f:
@@ -175,12 +3102,33 @@ class MinecraftLauncher(ctk.CTk):
         except Exception as e:
             print(f"Error saving config: {e}")
 
-    def check_updates(self, silent=False):
-        updates, release = self.update_manager.check_updates()
-        if updates and any(updates.values()):
-            self.show_update_dialog(updates)
-        elif not silent:
-            messagebox.showinfo("No Updates", "You're already up to date!")
+    def check_updates(self):
+        """Offers an update the scheduler has finished downloading, once per release and never mid-game"""
+        scheduler = self.update_scheduler
+        release = scheduler.release
+        if scheduler.state != "ready" or not release or release["tag_name"] == self.offered_release:
+            return
+        if getattr(self, "process", None) and self.process.poll() is None:
+            return
+        if not (scheduler.launcher_path or self.update_manager.load_stage_state().get("ready")):
+            return
+        self.offered_release = release["tag_name"]
+        self.show_update_dialog(scheduler.updates)
+
+    def poll_update_status(self):
+        """Mirrors background update progress into the sidebar"""
+        event = UpdateProgress.latest(self.update_events)
+        label = getattr(self, "update_status_label", None)
+        if event:
+            self.update_status_event = event
+        if label is not None and label.winfo_exists():
+            event = getattr(self, "update_status_event", None)
+            if event and event["phase"] != "Idle":
+                label.configure(text=UpdateProgress.describe(event))
+            else:
+                label.configure(text=self.update_manager.governor.describe())
+        self.after(500, self.poll_update_status)
+        self.check_updates()
 
     def show_update_dialog(self, updates):
         dialog = ctk.CTkToplevel(self)
@@ -234,7 +3182,7 @@ class MinecraftLauncher(ctk.CTk):
 
         # Warning Text
         ctk.CTkLabel(main_frame,
-                text="Update required to play!",
+                text="Downloaded and ready to install",
                 text_color="#E74C3C",
                 font=ctk.CTkFont(size=12)).pack(pady=(5, 10))
 
@@ -251,7 +3199,7 @@ class MinecraftLauncher(ctk.CTk):
         update_btn.pack(side="left", padx=5)
         
         cancel_btn = ctk.CTkButton(btn_frame,
-                                text="Cancel",
+                                text="Later",
                                 fg_color="#3A3A3A",
                                 hover_color="#2B2B2B",
                                 border_color="#FF4B4B",
@@ -265,27 +3213,52 @@ class MinecraftLauncher(ctk.CTk):
     def handle_update_choice(self, choice, dialog):
         self.update_choice = choice
         dialog.destroy()
+        if choice:
+            self.start_update_process(self)
 
     def start_update_process(self, parent):
         progress_dialog = ctk.CTkToplevel(parent)
         progress_dialog.title("Updating...")
         progress_dialog.geometry("300x150")
         
-        progress_label = ctk.CTkLabel(progress_dialog, text="Downloading updates...")
+        progress_label = ctk.CTkLabel(progress_dialog, text="Checking for updates...", wraplength=280)
         progress_label.pack(pady=20)
         
-        progress_bar = ctk.CTkProgressBar(progress_dialog)
+        progress_bar = ctk.CTkProgressBar(progress_dialog, mode="determinate")
         progress_bar.pack(pady=10)
-        progress_bar.start()
-        
+        progress_bar.set(0)
+
+        events = self.update_manager.progress.subscribe()
+        self.follow_update_progress(events, progress_dialog, progress_label, progress_bar)
         threading.Thread(target=self.run_background_update, args=(progress_dialog, progress_bar)).start()
 
+    def follow_update_progress(self, events, dialog, label, progress_bar):
+        """Refreshes the progress dialog from update events a few times per second"""
+        if not dialog.winfo_exists():
+            self.update_manager.progress.unsubscribe(events)
+            return
+        event = UpdateProgress.latest(events)
+        if event:
+            label.configure(text=UpdateProgress.describe(event))
+            if event["bytes_total"]:
+                progress_bar.set(min(event["bytes_done"] / event["bytes_total"], 1.0))
+        self.after(250, lambda: self.follow_update_progress(events, dialog, label, progress_bar))
+
     def run_background_update(self, dialog, progress_bar):
         updates, release = self.update_manager.check_updates()
         if updates and any(updates.values()):
             restart_needed = self.update_manager.perform_update(updates, release)
+            if restart_needed is None:
+                self.after(0, dialog.destroy)
+                return
             self.after(0, lambda: [progress_bar.stop(), dialog.destroy(),
                                  self.show_update_complete(restart_needed)])
+        elif updates is None:
+            self.after(0, lambda: [dialog.destroy(),
+                                 messagebox.showerror("Update Error", "Could not check for updates.")])
+        else:
+            self.after(0, lambda: [dialog.destroy(),
+                                 messagebox.showinfo("No Updates", "You're already up to date!")])
 
     def show_update_complete(self, restart_needed):
         if restart_needed:
@@ -497,6 +3470,7 @@ class MinecraftLauncher(ctk.CTk):
         buttons_frame.grid(row=6, column=0, padx=20, pady=10, sticky="ew")
         buttons_frame.grid_columnconfigure(0, weight=1)
         buttons_frame.grid_columnconfigure(1, weight=1)
+        buttons_frame.grid_columnconfigure(2, weight=1)
 
         # Settings Button
         self.settings_button = ctk.CTkButton(buttons_frame,
@@ -515,6 +3489,15 @@ class MinecraftLauncher(ctk.CTk):
                                             corner_radius=10)
         self.open_folder_button.grid(row=0, column=1, padx=5, sticky="ew")
 
+        # Update Button
+        self.update_button = ctk.CTkButton(buttons_frame,
+                                       text="⟳",
+                                       command=lambda: self.start_update_process(self),
+                                       height=45,
+                                       width=5,
+                                       corner_radius=10)
+        self.update_button.grid(row=0, column=2, padx=5, sticky="ew")
+
 
         logout_button = ctk.CTkButton(self.sidebar_frame,
                                     text="Logout",
@@ -525,6 +3508,13 @@ class MinecraftLauncher(ctk.CTk):
                                     hover_color="#2B2B2B")
         logout_button.grid(row=7, column=0, padx=20, pady=20)
 
+        self.update_status_label = ctk.CTkLabel(self.sidebar_frame,
+                                            text="",
+                                            text_color="#808080",
+                                            wraplength=220,
+                                            font=ctk.CTkFont(size=11))
+        self.update_status_label.grid(row=8, column=0, padx=20, pady=(0, 10))
+
         # Create main content area
         self.main_frame = ctk.CTkFrame(self, corner_radius=10)
         self.main_frame.grid(row=0, column=1, padx=20, pady=20, sticky="nsew")
@@ -709,201 +3699,107 @@ class MinecraftLauncher(ctk.CTk):
             messagebox.showerror("Error", "Username already exists")
 
 
-    def check_updates(self, silent=False):
-        """Returns tuple: (updates_dict, release_info)"""
-        updates, release = self.update_manager.check_updates()
-        if not silent and updates and any(updates.values()):
-            self.show_update_dialog(updates)
-        return updates, release  # Return the original updates dictionary
-
-
-
     def run_minecraft(self):
         if not self.logged_in_username:
             messagebox.showerror("Error", "Not logged in!")
             return
 
-        updates, release = self.check_updates(silent=True)
-        
-        if updates and any(updates.values()):
-            if not self.show_update_dialog(updates):
-                messagebox.showwarning("Update Required", 
-                    "You must update to play!")
-                self.cleanup_after_launch()
-                return
-            else:
-                restart_needed = self.update_manager.perform_update(updates, release)
-                if restart_needed:
-                    return
-
         # Configure UI for launch
         self.launch_button.configure(state="disabled")
         self.progress_bar.grid()
         self.progress_bar.configure(mode="indeterminate")
         self.progress_bar.start()
 
-        selected_server = self.server_var.get()
-        server_ip = "localhost"
-        server_port = "25565" if selected_server == "Vanilla" else "25566"
-
-
-
-        java_path = os.path.join("Minecraft", "jre", "java-runtime-gamma", "windows-x64", "java-runtime-gamma", "bin", "javaw.exe")
-        minecraft_dir = os.path.join("Minecraft", "game")
-        natives_dir = os.path.join(minecraft_dir, "versions", "Fabric 1.20.4", "natives")
-        libraries = [
-            os.path.join(minecraft_dir, "libraries", "com", "github", "oshi", "oshi-core", "6.4.5", "oshi-core-6.4.5.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "google", "code", "gson", "gson", "2.10.1", "gson-2.10.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "google", "guava", "failureaccess", "1.0.1", "failureaccess-1.0.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "google", "guava", "guava", "32.1.2-jre", "guava-32.1.2-jre.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "ibm", "icu", "icu4j", "73.2", "icu4j-73.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "by", "ely", "authlib", "6.0.52-ely.4", "authlib-6.0.52-ely.4.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "mojang", "blocklist", "1.0.10", "blocklist-1.0.10.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "mojang", "brigadier", "1.2.9", "brigadier-1.2.9.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "mojang", "datafixerupper", "6.0.8", "datafixerupper-6.0.8.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "mojang", "logging", "1.1.1", "logging-1.1.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "ru", "tln4", "empty", "0.1", "empty-0.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "mojang", "text2speech", "1.17.9", "text2speech-1.17.9.jar"),
-            os.path.join(minecraft_dir, "libraries", "commons-codec", "commons-codec", "1.16.0", "commons-codec-1.16.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "commons-io", "commons-io", "2.13.0", "commons-io-2.13.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "commons-logging", "commons-logging", "1.2", "commons-logging-1.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-buffer", "4.1.97.Final", "netty-buffer-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-codec", "4.1.97.Final", "netty-codec-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-common", "4.1.97.Final", "netty-common-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-handler", "4.1.97.Final", "netty-handler-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-resolver", "4.1.97.Final", "netty-resolver-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-transport-classes-epoll", "4.1.97.Final", "netty-transport-classes-epoll-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-transport-native-unix-common", "4.1.97.Final", "netty-transport-native-unix-common-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "io", "netty", "netty-transport", "4.1.97.Final", "netty-transport-4.1.97.Final.jar"),
-            os.path.join(minecraft_dir, "libraries", "it", "unimi", "dsi", "fastutil", "8.5.12", "fastutil-8.5.12.jar"),
-            os.path.join(minecraft_dir, "libraries", "net", "java", "dev", "jna", "jna-platform", "5.13.0", "jna-platform-5.13.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "net", "java", "dev", "jna", "jna", "5.13.0", "jna-5.13.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "net", "sf", "jopt-simple", "jopt-simple", "5.0.4", "jopt-simple-5.0.4.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "commons", "commons-compress", "1.22", "commons-compress-1.22.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "commons", "commons-lang3", "3.13.0", "commons-lang3-3.13.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "httpcomponents", "httpclient", "4.5.13", "httpclient-4.5.13.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "httpcomponents", "httpcore", "4.4.16", "httpcore-4.4.16.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "logging", "log4j", "log4j-api", "2.19.0", "log4j-api-2.19.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "logging", "log4j", "log4j-core", "2.19.0", "log4j-core-2.19.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "apache", "logging", "log4j", "log4j-slf4j2-impl", "2.19.0", "log4j-slf4j2-impl-2.19.0.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "joml", "joml", "1.10.5", "joml-1.10.5.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-glfw", "3.3.2", "lwjgl-glfw-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-glfw", "3.3.2", "lwjgl-glfw-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-glfw", "3.3.2", "lwjgl-glfw-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-glfw", "3.3.2", "lwjgl-glfw-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-jemalloc", "3.3.2", "lwjgl-jemalloc-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-jemalloc", "3.3.2", "lwjgl-jemalloc-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-jemalloc", "3.3.2", "lwjgl-jemalloc-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-jemalloc", "3.3.2", "lwjgl-jemalloc-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-openal", "3.3.2", "lwjgl-openal-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-openal", "3.3.2", "lwjgl-openal-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-openal", "3.3.2", "lwjgl-openal-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-openal", "3.3.2", "lwjgl-openal-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-opengl", "3.3.2", "lwjgl-opengl-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-opengl", "3.3.2", "lwjgl-opengl-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-opengl", "3.3.2", "lwjgl-opengl-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-opengl", "3.3.2", "lwjgl-opengl-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-stb", "3.3.2", "lwjgl-stb-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-stb", "3.3.2", "lwjgl-stb-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-stb", "3.3.2", "lwjgl-stb-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-stb", "3.3.2", "lwjgl-stb-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-tinyfd", "3.3.2", "lwjgl-tinyfd-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-tinyfd", "3.3.2", "lwjgl-tinyfd-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-tinyfd", "3.3.2", "lwjgl-tinyfd-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl-tinyfd", "3.3.2", "lwjgl-tinyfd-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl", "3.3.2", "lwjgl-3.3.2.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl", "3.3.2", "lwjgl-3.3.2-natives-windows.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl", "3.3.2", "lwjgl-3.3.2-natives-windows-arm64.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "lwjgl", "lwjgl", "3.3.2", "lwjgl-3.3.2-natives-windows-x86.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "slf4j", "slf4j-api", "2.0.7", "slf4j-api-2.0.7.jar"),
-            # ASM libraries
-            os.path.join(minecraft_dir, "libraries", "org", "ow2", "asm", "asm", "9.7.1", "asm-9.7.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "ow2", "asm", "asm-analysis", "9.7.1", "asm-analysis-9.7.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "ow2", "asm", "asm-commons", "9.7.1", "asm-commons-9.7.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "ow2", "asm", "asm-tree", "9.7.1", "asm-tree-9.7.1.jar"),
-            os.path.join(minecraft_dir, "libraries", "org", "ow2", "asm", "asm-util", "9.7.1", "asm-util-9.7.1.jar"),
-
-            # Fabric libraries
-            os.path.join(minecraft_dir, "libraries", "net", "fabricmc", "sponge-mixin", "0.15.4+mixin.0.8.7", "sponge-mixin-0.15.4+mixin.0.8.7.jar"),
-            os.path.join(minecraft_dir, "libraries", "net", "fabricmc", "intermediary", "1.20.4", "intermediary-1.20.4.jar"),
-            os.path.join(minecraft_dir, "libraries", "net", "fabricmc", "fabric-loader", "0.16.10", "fabric-loader-0.16.10.jar"),
-
-            # Existing libraries (keep these)
-            os.path.join(minecraft_dir, "libraries", "com", "github", "oshi", "oshi-core", "6.4.5", "oshi-core-6.4.5.jar"),
-            os.path.join(minecraft_dir, "libraries", "com", "google", "code", "gson", "gson", "2.10.1", "gson-2.10.1.jar"),
-            # ... keep all other existing library entries ...
-
-            # Updated main JAR
-            os.path.join(minecraft_dir, "versions", "Fabric 1.20.4", "Fabric 1.20.4.jar")
-        ]
+        self.launch_timeline = LaunchTimeline(self.launch_metrics)
+        self.launch_deadline = time.monotonic() + self.UPDATE_CHECK_BUDGET
+        self.wait_for_update_check()
 
-        # Java arguments
-        java_args = [
-            f"-Xms{self.allocated_ram}M",
-            "-XX:+UnlockExperimentalVMOptions",
-            "-XX:+DisableExplicitGC",
-            "-XX:MaxGCPauseMillis=200",
-            "-XX:+AlwaysPreTouch",
-            "-XX:+ParallelRefProcEnabled",
-            "-XX:+UseG1GC",
-            "-XX:G1NewSizePercent=40",
-            "-XX:G1MaxNewSizePercent=50",
-            "-XX:G1HeapRegionSize=16M",
-            "-XX:G1ReservePercent=15",
-            "-XX:InitiatingHeapOccupancyPercent=20",
-            "-XX:G1HeapWastePercent=5",
-            "-XX:G1MixedGCCountTarget=4",
-            "-XX:G1MixedGCLiveThresholdPercent=90",
-            "-XX:G1RSetUpdatingPauseTimePercent=5",
-            "-XX:+UseStringDeduplication",
-            "-Xmx16384M",
-            "-Dfile.encoding=UTF-8",
-            f"-Djava.library.path={natives_dir}",
-            f"-Djna.tmpdir={natives_dir}",
-            f"-Dorg.lwjgl.system.SharedLibraryExtractPath={natives_dir}",
-            f"-Dio.netty.native.workdir={natives_dir}",
-            "-Dminecraft.launcher.brand=java-minecraft-launcher",
-            "-Dminecraft.launcher.version=1.6.84-j",
-            "-cp", ";".join(libraries),
-            "net.fabricmc.loader.impl.launch.knot.KnotClient",  # Changed main class
-            "--username", self.logged_in_username,
-            "--version", "Fabric 1.20.4",  # Updated version
-            "--gameDir", minecraft_dir,
-            "--assetsDir", os.path.join(minecraft_dir, "assets"),
-            "--assetIndex", "12",
-            "--uuid", "501e8da5b1cd3df89970618b2b706e97",
-            "--accessToken", "[Minecraft is a lie]",
-            "--userType", "legacy",
-            "--versionType", "release",
-            "--width", "925",
-            "--height", "530",
-            "--server", server_ip,
-            "--port", server_port
-        ]
+    def wait_for_update_check(self):
+        """Gives an in-flight update check a short budget, then launches whatever is verified"""
+        scheduler = self.update_scheduler
+        if scheduler.state in ("idle", "checking") and time.monotonic() < self.launch_deadline:
+            self.after(100, self.wait_for_update_check)
+            return
+
+        if scheduler.launcher_path and messagebox.askyesno(
+                "Launcher Update", "A launcher update has been downloaded. Restart now to install it?"):
+            self.update_manager.install_launcher(scheduler.launcher_path)
+            return
 
-    # Launch process
         try:
-            self.process = subprocess.Popen(
-                [java_path] + java_args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            scheduler.apply_staged_modpack()
+        except Exception as e:
+            print(f"Applying staged update failed: {e}")
+        if scheduler.state == "staging":
+            print("Modpack update still downloading; launching the installed version")
+        elif self.update_manager.governor.describe():
+            print(self.update_manager.governor.describe())
+        self.launch_timeline.mark("update_check")
+        self.launch_game()
+
+    def launch_game(self):
+        timeline = self.launch_timeline
+        timeline.modpack = self.update_manager.current_version["modpack"]
+        try:
+            profile = self.launch_profiles.get(timeline.modpack, self.server_var.get(), self.allocated_ram)
+        except (OSError, ValueError, KeyError, StopIteration) as e:
+            timeline.finish("failed")
+            self.cleanup_after_launch()
+            messagebox.showerror("Launch Failed", f"Could not read the game version files:\n{str(e)}")
+            return
+
+        jvm_args = []
+        if self.config.get("class_data_sharing", True):
+            try:
+                jvm_args = self.class_data_sharing.launch_args(profile)
+            except OSError as e:
+                print(f"Class data sharing unavailable: {e}")
+        timeline.mark("profile")
+
+        try:
+            self.process = LaunchProfiles.start(profile, self.logged_in_username, jvm_args=jvm_args)
+            timeline.mark("spawn")
+            self.log_pump = GameLogPump(self.process, self.APP_DATA_DIR / "logs", timeline=timeline)
             
-            # Close launcher after short delay if process starts successfully
-            self.after(5000, self.quit)  # Close after 3 seconds
+            # Get out of the way once the game is up; the launcher keeps draining its output
+            self.after(5000, self.hide_while_playing)
             self.monitor_process()
 
         except Exception as e:
+            timeline.finish("failed")
             self.cleanup_after_launch()
             messagebox.showerror("Launch Failed", f"Failed to start Minecraft:\n{str(e)}")
 
+    def hide_while_playing(self):
+        if self.process.poll() is None:
+            self.withdraw()
+
     def monitor_process(self):
-        # Only check for immediate errors
-        if self.process.poll() is not None and self.process.returncode != 0:
-            error = self.process.stderr.read().decode()
-            self.show_launch_error(error)
-            self.cleanup_after_launch()
+        if self.process.poll() is None:
+            self.after(1000, self.monitor_process)
+            return
+        self.log_pump.join(timeout=5)
+        self.launch_timeline.finish("crashed" if self.process.returncode else "exited")
+        if self.process.returncode != 0:
+            self.deiconify()
+            self.show_launch_error(self.diagnose_crash())
+        else:
+            self.quit()
+
+    def diagnose_crash(self):
+        """Explains a failed run from known signatures in its output and the game's own log"""
+        findings = {f["category"]: f for f in self.log_pump.scanner.report()}
+        game_log = os.path.join("Minecraft", "game", "logs", "latest.log")
+        try:
+            if os.path.getmtime(game_log) >= self.log_pump.started:
+                for finding in LogScanner.scan_file(game_log):
+                    findings.setdefault(finding["category"], finding)
+        except OSError:
+            pass
+        if not findings:
+            return self.log_pump.tail(max_lines=40)
+        order = list(LogScanner.SIGNATURES)
+        return LogScanner.describe(sorted(findings.values(), key=lambda f: order.index(f["category"])))
 
     def cleanup_after_launch(self):
         self.progress_bar.stop()
@@ -919,7 +3815,7 @@ class MinecraftLauncher(ctk.CTk):
     def open_settings(self):
         settings_window = ctk.CTkToplevel(self)
         settings_window.title("Settings")
-        settings_window.geometry("400x465")
+        settings_window.geometry("420x760")
         settings_window.transient(self)
         
         main_container = ctk.CTkFrame(settings_window)
@@ -990,15 +3886,69 @@ class MinecraftLauncher(ctk.CTk):
         self.ram_label = ctk.CTkLabel(ram_frame, text=f"Current: {self.allocated_ram} MB")
         self.ram_label.pack(pady=5)
 
+        self.tuning_label = ctk.CTkLabel(ram_frame,
+                                     text="",
+                                     text_color="#808080",
+                                     justify="left",
+                                     wraplength=340,
+                                     font=ctk.CTkFont(size=11))
+        self.tuning_label.pack(pady=(0, 10), padx=10)
+        self.refresh_tuning_label(self.allocated_ram)
+        # The first look at the Java runtime spawns it once; keep that off the UI thread
+        java_path = LaunchProfiles.find_java()
+        threading.Thread(target=lambda: [self.launch_profiles.tuner.java_version(java_path),
+                                         self.after(0, lambda: self.refresh_tuning_label(self.ram_slider.get()))],
+                         daemon=True).start()
+
         # Link entry changes to slider
         self.ram_entry.bind("<KeyRelease>", self.update_slider_from_entry)
 
+        # LAN Sharing
+        self.lan_sharing_var = ctk.BooleanVar(value=self.config["lan_peer_sharing"])
+        ctk.CTkCheckBox(main_container,
+                    text="Share updates with players on my LAN",
+                    variable=self.lan_sharing_var,
+                    checkbox_width=20,
+                    checkbox_height=20,
+                    border_color="#FF4B4B",
+                    fg_color="#FF4B4B").pack(pady=(10, 0))
+
         # Save Button
         save_button = ctk.CTkButton(main_container,
                                 text="Save Settings",
                                 command=lambda: self.save_settings(settings_window),
                                 corner_radius=10)
-        save_button.pack(pady=20)
+        save_button.pack(pady=(20, 5))
+
+        rollback_button = ctk.CTkButton(main_container,
+                                    text="Roll Back Modpack",
+                                    command=self.rollback_modpack,
+                                    fg_color="transparent",
+                                    border_color="#FF4B4B",
+                                    border_width=2,
+                                    hover_color="#2B2B2B",
+                                    corner_radius=10)
+        rollback_button.pack(pady=5)
+
+        repair_button = ctk.CTkButton(main_container,
+                                  text="Verify and Repair Modpack",
+                                  command=self.repair_modpack,
+                                  fg_color="transparent",
+                                  border_color="#4CAF50",
+                                  border_width=2,
+                                  hover_color="#2B2B2B",
+                                  corner_radius=10)
+        repair_button.pack(pady=5)
+
+        timings_button = ctk.CTkButton(main_container,
+                                   text="Launch Timings",
+                                   command=self.show_launch_timings,
+                                   fg_color="transparent",
+                                   border_color="#808080",
+                                   border_width=2,
+                                   hover_color="#2B2B2B",
+                                   corner_radius=10)
+        timings_button.pack(pady=5)
 
     def validate_ram_input(self, value):
         """Validate RAM entry input"""
@@ -1013,10 +3963,23 @@ class MinecraftLauncher(ctk.CTk):
         """Update both slider and entry when slider moves"""
         ram_value = int(float(value))
         self.ram_label.configure(text=f"Current: {ram_value} MB")
+        self.refresh_tuning_label(ram_value)
         if self.ram_entry.get() != str(ram_value):
             self.ram_entry.delete(0, "end")
             self.ram_entry.insert(0, str(ram_value))
 
+    def refresh_tuning_label(self, ram):
+        """Shows how the JVM will actually be set up for the chosen RAM"""
+        tuner = self.launch_profiles.tuner
+        java_path = LaunchProfiles.find_java()
+        total_mb, cores = tuner.hardware()
+        with tuner.lock:
+            known = any(path == java_path for path, _ in tuner.versions)
+        java_major = tuner.java_version(java_path) if known else None
+        _, reasons = tuner.tune(int(float(ram)), total_mb, cores, java_major)
+        if self.tuning_label.winfo_exists():
+            self.tuning_label.configure(text="\n".join(reasons))
+
     def update_slider_from_entry(self, event):
         """Update slider position when entry changes"""
         if self.ram_entry.get():
@@ -1025,9 +3988,58 @@ class MinecraftLauncher(ctk.CTk):
                 if 1024 <= value <= 16384:
                     self.ram_slider.set(value)
                     self.ram_label.configure(text=f"Current: {value} MB")
+                    self.refresh_tuning_label(value)
             except ValueError:
                 pass
 
+    def rollback_modpack(self):
+        previous = self.update_manager.current_version.get("previous_modpack")
+        if not previous:
+            messagebox.showinfo("Roll Back", "There is no previous modpack version to roll back to.")
+            return
+        if self.update_scheduler.state == "staging":
+            messagebox.showinfo("Roll Back", "An update is downloading in the background. Please try again shortly.")
+            return
+        if not messagebox.askyesno("Roll Back", f"Restore modpack version {previous}?"):
+            return
+        try:
+            self.update_manager.rollback_modpack()
+            messagebox.showinfo("Roll Back", f"Modpack restored to version {previous}")
+        except Exception as e:
+            messagebox.showerror("Roll Back", f"Rollback failed: {str(e)}")
+
+    def repair_modpack(self):
+        if self.update_scheduler.state == "staging":
+            messagebox.showinfo("Repair", "An update is downloading in the background. Please try again shortly.")
+            return
+
+        def run():
+            try:
+                repaired = self.update_manager.verify_modpack()
+                message = (f"Repaired {len(repaired)} file(s):\n" + "\n".join(repaired[:10]) if repaired
+                           else "All modpack files are intact.")
+                self.after(0, lambda: messagebox.showinfo("Repair", message))
+            except Exception as e:
+                error = str(e)
+                self.after(0, lambda: messagebox.showerror("Repair", f"Verification failed: {error}"))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_launch_timings(self):
+        """Shows p50/p95 per launch phase over recent launches, per modpack version"""
+        timings_window = ctk.CTkToplevel(self)
+        timings_window.title("Launch Timings")
+        timings_window.geometry("460x420")
+        timings_window.transient(self)
+
+        text = ctk.CTkTextbox(timings_window, font=ctk.CTkFont(family="Courier", size=12))
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+        try:
+            text.insert("end", LaunchMetrics.describe(self.launch_metrics.summary()))
+        except sqlite3.Error as e:
+            text.insert("end", f"Reading launch timings failed: {e}")
+        text.configure(state="disabled")
+
     def open_minecraft_folder(self):
         minecraft_dir = os.path.abspath(os.path.join("Minecraft", "game"))
         if os.path.exists(minecraft_dir):
@@ -1043,6 +4055,11 @@ class MinecraftLauncher(ctk.CTk):
             if 1024 <= ram_value <= 16384:
                 self.allocated_ram = ram_value
                 self.config["ram_allocation"] = ram_value
+                self.config["lan_peer_sharing"] = self.lan_sharing_var.get()
+                if self.config["lan_peer_sharing"]:
+                    self.start_peer_sharing()
+                else:
+                    self.update_manager.stop_peer_server()
                 self.save_config()
                 messagebox.showinfo("Settings Saved", f"RAM allocation set to {ram_value} MB")
                 window.destroy()
@@ -1061,13 +4078,147 @@ class MinecraftLauncher(ctk.CTk):
 
 
     def on_close(self):
+        self.update_manager.stop_peer_server()
         self.save_config()
         self.conn.close()
         self.destroy()
 
 
 
+def run_headless_update():
+    manager = UpdateManager(None)
+    events = manager.progress.subscribe()
+    finished = threading.Event()
+
+    def log_progress():
+        while not finished.is_set():
+            event = UpdateProgress.latest(events)
+            if event:
+                print(UpdateProgress.describe(event), flush=True)
+            finished.wait(1.0)
+
+    updates, release = manager.check_updates()
+    if updates is None:
+        return 1
+    if not any(updates.values()):
+        print("Already up to date")
+        return 0
+    logger = threading.Thread(target=log_progress, daemon=True)
+    logger.start()
+    try:
+        result = manager.perform_update(updates, release)
+    finally:
+        finished.set()
+        logger.join()
+    event = UpdateProgress.latest(events)
+    if event:
+        print(UpdateProgress.describe(event))
+    return 1 if result is None else 0
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RBC Network Launcher")
+    parser.add_argument("--build-manifest", nargs=2, metavar=("VERSION", "OUTPUT"),
+                        help="write the release manifest for the modpack directory and exit")
+    parser.add_argument("--build-chunk-index", nargs=2, metavar=("VERSION", "OUTPUT"),
+                        help="write the chunk index for large modpack files and exit")
+    parser.add_argument("--build-patch", nargs=3, metavar=("OLD", "NEW", "OUTPUT"),
+                        help="write a launcher delta patch from OLD to NEW and exit")
+    parser.add_argument("--build-delta", nargs=5, metavar=("OLD_DIR", "FROM", "TO", "OUTPUT", "URL"),
+                        help="write a delta pack from OLD_DIR to the modpack directory and print its deltas.json entry")
+    parser.add_argument("--update", action="store_true",
+                        help="check for and install updates without the UI, logging progress")
+    parser.add_argument("--verify", action="store_true",
+                        help="check the installed modpack against its release and exit")
+    parser.add_argument("--repair", action="store_true",
+                        help="re-download missing or corrupt modpack files and exit")
+    parser.add_argument("--launch", metavar="USERNAME",
+                        help="start the game without the UI and wait for it to exit")
+    parser.add_argument("--server", default="Vanilla (25565)",
+                        help="server for --launch and --dump-profile, as shown in the launcher")
+    parser.add_argument("--ram", type=int, help="RAM in MB for --launch and --dump-profile (default: config)")
+    parser.add_argument("--dump-profile", action="store_true",
+                        help="print the compiled launch profile and exit")
+    parser.add_argument("--scan-log", metavar="PATH",
+                        help="report known failure signatures in a game log (.log or .log.gz) and exit")
+    parser.add_argument("--launch-stats", nargs="?", const=50, type=int, metavar="LAUNCHES",
+                        help="print p50/p95 per launch phase over the most recent launches (default 50) and exit")
+    parser.add_argument("--rollback", action="store_true",
+                        help="restore the previous modpack version and exit")
+    args = parser.parse_args()
+
+    if args.build_manifest:
+        version, output = args.build_manifest
+        with open(output, "w") as f:
+            json.dump(UpdateManager.build_manifest("Minecraft/game", version), f, indent=2)
+        sys.exit(0)
+
+    if args.build_chunk_index:
+        version, output = args.build_chunk_index
+        with open(output, "w") as f:
+            json.dump(ChunkStore.build_index("Minecraft/game", version), f)
+        sys.exit(0)
+
+    if args.build_patch:
+        old_path, new_path, output = args.build_patch
+        with open(output, "wb") as f:
+            f.write(BinaryPatch.create(Path(old_path).read_bytes(), Path(new_path).read_bytes()))
+        sys.exit(0)
+
+    if args.build_delta:
+        old_dir, source, target, output, url = args.build_delta
+        print(json.dumps(UpdateManager.build_delta(old_dir, "Minecraft/game", source, target, output, url), indent=2))
+        sys.exit(0)
+
+    if args.update:
+        sys.exit(run_headless_update())
+
+    if args.verify or args.repair:
+        damaged = UpdateManager(None).verify_modpack(repair=args.repair)
+        for path in damaged:
+            print(f"{'Repaired' if args.repair else 'Damaged'}: {path}")
+        print(f"{len(damaged)} file(s) {'repaired' if args.repair else 'damaged'}")
+        sys.exit(1 if damaged and not args.repair else 0)
+
+    if args.launch or args.dump_profile:
+        try:
+            with open(MinecraftLauncher.CONFIG_FILE, "r") as f:
+                config = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            config = {}
+        ram = args.ram or config.get("ram_allocation", 2048)
+        profiles = LaunchProfiles(MinecraftLauncher.APP_DATA_DIR / "profiles.json",
+                                  ClasspathResolver(os.path.join("Minecraft", "game"), "Fabric 1.20.4",
+                                                    MinecraftLauncher.APP_DATA_DIR / "classpath.json"))
+        timeline = LaunchTimeline(LaunchMetrics(MinecraftLauncher.APP_DATA_DIR / "metrics.db"),
+                                  UpdateManager(None).load_version()["modpack"])
+        profile = profiles.get(timeline.modpack, args.server, ram)
+        if args.dump_profile:
+            print(json.dumps(profile, indent=2))
+            sys.exit(0)
+        jvm_args = []
+        if config.get("class_data_sharing", True):
+            jvm_args = ClassDataSharing(MinecraftLauncher.APP_DATA_DIR / "cds").launch_args(profile)
+        timeline.mark("profile")
+        process = LaunchProfiles.start(profile, args.launch, capture=False, jvm_args=jvm_args)
+        timeline.mark("spawn")
+        # The game writes straight to the terminal here, so its own phases are not timed
+        timeline.finish("crashed" if process.wait() else "exited")
+        sys.exit(process.returncode)
+
+    if args.scan_log:
+        findings = LogScanner.scan_file(args.scan_log)
+        print(LogScanner.describe(findings) if findings else "No known failure signatures found")
+        sys.exit(1 if findings else 0)
+
+    if args.launch_stats:
+        print(LaunchMetrics.describe(LaunchMetrics(MinecraftLauncher.APP_DATA_DIR / "metrics.db")
+                                     .summary(args.launch_stats)))
+        sys.exit(0)
+
+    if args.rollback:
+        print(f"Modpack restored to version {UpdateManager(None).rollback_modpack()}")
+        sys.exit(0)
+
     app = MinecraftLauncher()
-    app.after(1000, lambda: app.check_updates(silent=True))
     app.mainloop()
\ No newline at end of file